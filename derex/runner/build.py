@@ -1,11 +1,9 @@
-from derex.runner.constants import DEREX_TEMPLATES_DIR
 from derex.runner.constants import ProjectBuildTargets
 from derex.runner.docker_utils import build_image
 from derex.runner.docker_utils import buildx_image
 from derex.runner.docker_utils import docker_has_experimental
 from derex.runner.project import Project
-from jinja2 import Environment
-from jinja2 import FileSystemLoader
+from derex.runner.template_utils import get_template
 from pathlib import Path
 from typing import Dict
 from typing import List
@@ -179,8 +177,7 @@ def build_project_image(
             if directory and directory.is_dir():
                 paths_to_copy.append(directory)
 
-    jinja_environment = Environment(loader=FileSystemLoader(DEREX_TEMPLATES_DIR))
-    dockerfile_template = jinja_environment.get_template("Dockerfile-project.j2")
+    dockerfile_template = get_template("Dockerfile-project.j2")
     dockerfile_text = dockerfile_template.render(
         project=project,
     )
@@ -1,13 +1,13 @@
 # -*- coding: utf-8 -*-
-"""Console script for derex.runner."""
-from .build import build
-from .mongodb import mongodb
-from .mysql import mysql
-from .test import test
-from .translations import translations
+"""Console script for derex.runner.
+
+Subcommands defined in their own modules (and the ones provided by plugins)
+are only imported when needed, to keep the startup of the `derex` command fast.
+"""
 from .utils import ensure_project
+from .utils import LazyChoice
+from .utils import LazyGroup
 from .utils import red
-from click_plugins import with_plugins
 from derex.runner.logging_utils import setup_logging_decorator
 from derex.runner.project import DebugBaseImageProject
 from derex.runner.project import Project
@@ -20,18 +20,28 @@ from typing import Any
 from typing import Optional
 
 import click
-import importlib_metadata
 import logging
 import os
-import rich
 import sys
 
 
 logger = logging.getLogger(__name__)
 
+LAZY_SUBCOMMANDS = {
+    "build": "derex.runner.cli.build.build",
+    "mongodb": "derex.runner.cli.mongodb.mongodb",
+    "mysql": "derex.runner.cli.mysql.mysql",
+    "test": "derex.runner.cli.test.test",
+    "translations": "derex.runner.cli.translations.translations",
+}
+
 
-@with_plugins(importlib_metadata.entry_points().select(group="derex.runner.cli_plugins"))  # type: ignore
-@click.group(invoke_without_command=True)
+@click.group(
+    cls=LazyGroup,
+    lazy_subcommands=LAZY_SUBCOMMANDS,
+    plugins_group="derex.runner.cli_plugins",
+    invoke_without_command=True,
+)
 @click.version_option()
 @click.pass_context
 @setup_logging_decorator
@@ -55,6 +65,8 @@ def derex(ctx):
 
     from derex.runner.docker_utils import get_exposed_container_names
 
+    import rich.box
+
     container_names = get_exposed_container_names()
     if not container_names:
         return
@@ -247,7 +259,7 @@ def materialize_settings(ctx, _, value):
 @ensure_project
 @click.argument(
     "settings",
-    type=click.Choice(get_available_settings()),
+    type=LazyChoice(get_available_settings),
     required=False,
     callback=materialize_settings,
 )
@@ -284,6 +296,67 @@ def print_secret(secret):
     return 0
 
 
+@debug.command("plugins")
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Run the ddc hooks and report the time and memory each plugin takes",
+)
+@click.option(
+    "--json",
+    "json_path",
+    type=click.Path(dir_okay=False, writable=True, allow_dash=True),
+    help="With --profile, also write the results as JSON to this file ('-' for stdout)",
+)
+@click.pass_obj
+def debug_plugins(project: Optional[Project], profile: bool, json_path: Optional[str]):
+    """List derex plugins and the hooks they implement"""
+    from derex.runner import __version__
+    from derex.runner.plugins import get_plugin_manager
+    from derex.runner.plugins import hook_profiler
+
+    import json
+
+    plugin_manager = get_plugin_manager()
+    console = get_rich_console()
+    if not profile:
+        table = get_rich_table("Plugin", "Hooks", title="Derex plugins")
+        for name, plugin in sorted(plugin_manager.list_name_plugin()):
+            hooks = [caller.name for caller in plugin_manager.get_hookcallers(plugin)]
+            table.add_row(name, ", ".join(sorted(hooks)))
+        console.print(table)
+        return 0
+
+    hook_profiler.start()
+    try:
+        plugin_manager.hook.ddc_services_options()
+        plugin_manager.hook.ddc_services_volumes()
+        if project is not None:
+            plugin_manager.hook.ddc_project_options(project=project)
+    finally:
+        hook_profiler.stop()
+    records = hook_profiler.get_records()
+
+    table = get_rich_table(
+        "Hook", "Plugin", "Calls", "Time (ms)", "Memory (KiB)", title="Plugin hooks"
+    )
+    for record in records:
+        table.add_row(
+            record["hook"],
+            record["plugin"],
+            str(record["calls"]),
+            f"{record['seconds'] * 1000:.1f}",
+            f"{record['memory'] / 1024:.1f}",
+        )
+    if json_path:
+        trace = json.dumps({"derex_version": __version__, "hooks": records}, indent=2)
+        with click.open_file(json_path, "w") as fh:
+            fh.write(trace + "\n")
+    if json_path != "-":
+        console.print(table)
+    return 0
+
+
 @derex.command("minio-update-key")
 @click.option(
     "--old-key",
@@ -293,15 +366,15 @@ def print_secret(secret):
 )
 def minio_update_key(old_key: str):
     """Run minio to re-key data with the new secret"""
-    from derex.runner.ddc import run_ddc_services
+    from derex.runner.ddc import get_ddc_services_compose_project
     from derex.runner.docker_utils import wait_for_service
     from derex.runner.utils import derex_path
 
     wait_for_service("minio")
+    services = get_ddc_services_compose_project()
     MINIO_SCRIPT_PATH = derex_path("derex/runner/compose_files/minio-update-key.sh")
     click.echo("Updating MinIO secret key...")
     compose_args = [
-        "run",
         "--rm",
         "-v",
         f"{MINIO_SCRIPT_PATH}:/minio-update-key.sh",
@@ -314,7 +387,7 @@ def minio_update_key(old_key: str):
         "/minio-update-key.sh",
     ]
     try:
-        run_ddc_services(compose_args)
+        services.run(compose_args)
     except RuntimeError:
         return 1
 
@@ -323,19 +396,11 @@ def minio_update_key(old_key: str):
     # https://github.com/moby/moby/issues/8838
     # We'll let `docker-compose up` recreate it for us, if needed
     click.echo("\nRecreating MinIO container...")
-    compose_args = ["up", "-d", "minio"]
-    run_ddc_services(compose_args)
+    services.up(["-d", "minio"])
 
     wait_for_service("minio")
     click.echo("\nMinIO secret key updated successfully!")
     return 0
 
 
-derex.add_command(mysql)
-derex.add_command(mongodb)
-derex.add_command(build)
-derex.add_command(test)
-derex.add_command(translations)
-
-
 __all__ = ["derex"]
@@ -1,6 +1,5 @@
 from .utils import ensure_project
 from derex.runner import __version__
-from derex.runner.build import build_project_image
 from derex.runner.cli.utils import red
 from derex.runner.constants import ProjectBuildTargets
 from derex.runner.project import OpenEdXVersions
@@ -87,6 +86,8 @@ def project(
     the target image computed tag and the registry (from option or from project
     config).
     """
+    from derex.runner.build import build_project_image
+
     if not project.get_project_hash():
         click.echo("No customizations found for this project, nothing to build.")
         return 0
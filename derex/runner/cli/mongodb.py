@@ -1,6 +1,7 @@
 from derex.runner.project import Project
 from derex.runner.utils import get_rich_console
 from derex.runner.utils import get_rich_table
+from typing import cast
 from typing import Optional
 from typing import Tuple
 
@@ -132,12 +133,19 @@ def create_user_cmd(user: str, password: str, role: Optional[Tuple]):
 @click.argument("source_db_name", type=str, required=True)
 @click.argument("destination_db_name", type=str)
 @click.option("--drop", is_flag=True, default=False, help="Drop the source database")
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=4,
+    help="Number of collections to copy concurrently",
+)
 @click.pass_obj
 def copy_mongodb(
     project: Optional[Project],
     source_db_name: str,
     destination_db_name: Optional[str],
     drop: bool,
+    workers: int,
 ):
     """
     Copy an existing mongodb database. If no destination database is given defaults
@@ -149,22 +157,40 @@ def copy_mongodb(
             param_type="str",
             message="Either specify a destination database name or run in a derex project.",
         )
-    if not destination_db_name and project:
-        destination_db_name = project.mongodb_db_name
+    if not destination_db_name:
+        # The check above makes sure we have a project
+        destination_db_name = cast(Project, project).mongodb_db_name
 
     if click.confirm(
         f'Copying database "{source_db_name}" to "{destination_db_name}."'
         "Are you sure you want to continue?"
     ):
         from derex.runner.mongodb import copy_database
+        from derex.runner.mongodb import get_mongodb_client
+        from rich.filesize import decimal
 
-        copy_database(source_db_name, destination_db_name)
+        client = get_mongodb_client(project.mongodb_service if project else "mongodb")
+        stats = copy_database(
+            source_db_name, destination_db_name, max_workers=workers, client=client
+        )
+        console = get_rich_console()
+        table = get_rich_table("Collection", "Documents", "Size", "Time", "Throughput")
+        for name, collection_stats in sorted(
+            stats.items(), key=lambda item: item[1]["seconds"], reverse=True
+        ):
+            seconds = collection_stats["seconds"]
+            table.add_row(
+                name,
+                str(collection_stats["documents"]),
+                decimal(collection_stats["bytes"]),
+                f"{seconds:.2f}s",
+                f"{decimal(int(collection_stats['bytes'] / max(seconds, 1e-6)))}/s",
+            )
+        console.print(table)
         if drop and click.confirm(
             f'Are you sure you want to drop database "{source_db_name}" ?'
         ):
-            from derex.runner.mongodb import drop_database
-
-            drop_database(source_db_name)
+            client.drop_database(source_db_name)
     return 0
 
 
@@ -3,6 +3,7 @@ from derex.runner.project import Project
 from derex.runner.project import ProjectRunMode
 from derex.runner.utils import get_rich_console
 from derex.runner.utils import get_rich_table
+from typing import cast
 from typing import Optional
 
 import click
@@ -129,14 +130,20 @@ def drop_user_cmd(user: str, host: str):
 
 
 @show.command(name="databases")
-def show_databases_cmd():
+@click.option(
+    "--sizes", is_flag=True, default=False, help="Also show data and index sizes"
+)
+def show_databases_cmd(sizes: bool):
     """List all MySQL databases"""
     from derex.runner.mysql import show_databases
 
     console = get_rich_console()
-    table = get_rich_table("Database", "Tables", "Django users", show_lines=True)
-    for database in show_databases():
-        table.add_row(database[0], str(database[1]), str(database[2]))
+    columns = ["Database", "Tables", "Django users"]
+    if sizes:
+        columns.extend(["Data size", "Index size"])
+    table = get_rich_table(*columns, show_lines=True)
+    for database in show_databases(sizes=sizes):
+        table.add_row(*map(str, database))
     console.print(table)
     return 0
 
@@ -157,9 +164,18 @@ def show_users_cmd():
 @mysql.command("copy-database")
 @click.argument("source_db_name", type=str, required=True)
 @click.argument("destination_db_name", type=str)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=4,
+    help="Number of tables to copy concurrently",
+)
 @click.pass_obj
 def copy_database_cmd(
-    project: Optional[Project], source_db_name: str, destination_db_name: Optional[str]
+    project: Optional[Project],
+    source_db_name: str,
+    destination_db_name: Optional[str],
+    workers: int,
 ):
     """
     Copy an existing mysql database. If no destination database is given it defaults
@@ -172,16 +188,35 @@ def copy_database_cmd(
             message="Either specify a destination database name or run in a derex project.",
         )
 
-    if not destination_db_name and project:
-        destination_db_name = project.mysql_db_name
+    if not destination_db_name:
+        # The check above makes sure we have a project
+        destination_db_name = cast(Project, project).mysql_db_name
+    service = project.mysql_service if project else "mysql"
 
     if click.confirm(
         f'Copying database "{source_db_name}" to "{destination_db_name}."'
         "Are you sure you want to continue?"
     ):
         from derex.runner.mysql import copy_database
+        from rich.filesize import decimal
 
-        copy_database(source_db_name, destination_db_name)
+        stats = copy_database(
+            source_db_name, destination_db_name, max_workers=workers, service=service
+        )
+        console = get_rich_console()
+        table = get_rich_table("Table", "Rows", "Size", "Time", "Throughput")
+        for name, table_stats in sorted(
+            stats.items(), key=lambda item: item[1]["seconds"], reverse=True
+        ):
+            seconds = table_stats["seconds"]
+            table.add_row(
+                name,
+                str(table_stats["rows"]),
+                decimal(table_stats["bytes"]),
+                f"{seconds:.2f}s",
+                f"{decimal(int(table_stats['bytes'] / max(seconds, 1e-6)))}/s",
+            )
+        console.print(table)
     return 0
 
 
@@ -193,7 +228,13 @@ def copy_database_cmd(
     default=False,
     help="Do not ask for confirmation and allow resetting mysql database if runmode is production",
 )
-def reset_mysql_cmd(context, force):
+@click.option(
+    "--no-snapshot",
+    is_flag=True,
+    default=False,
+    help="Restore the dump and load fixtures even if a snapshot of a previous reset is available",
+)
+def reset_mysql_cmd(context, force, no_snapshot):
     """Reset MySQL database for the current project"""
 
     if context.obj is None:
@@ -217,7 +258,7 @@ def reset_mysql_cmd(context, force):
             f'"{project.name}" default state ?'
         ):
             return 1
-    reset_mysql_openedx(DebugBaseImageProject())
+    reset_mysql_openedx(DebugBaseImageProject(), use_snapshot=not no_snapshot)
     return 0
 
 
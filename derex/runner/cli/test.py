@@ -1,8 +1,5 @@
 from .utils import ensure_project
 from .utils import red
-from derex.runner.compose_generation import generate_ddc_test_compose
-from derex.runner.ddc import run_docker_compose
-from derex.runner.docker_utils import wait_for_service
 
 import click
 import sys
@@ -18,6 +15,10 @@ def test():
 @ensure_project
 def e2e(project):
     """Run project e2e tests"""
+    from derex.runner.compose_generation import generate_ddc_test_compose
+    from derex.runner.ddc import run_docker_compose
+    from derex.runner.docker_utils import wait_for_service
+
     if not project.e2e_dir:
         click.echo(red(f"No e2e tests directory found in {project.root}"), err=True)
         return 1
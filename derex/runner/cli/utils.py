@@ -1,6 +1,12 @@
 """Utility functions for the derex commands.
 """
 from functools import wraps
+from importlib import import_module
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
 
 import click
 
@@ -22,3 +28,88 @@ def ensure_project(func):
 
 def red(string: str) -> str:
     return click.style(string, fg="red")
+
+
+class LazyGroup(click.Group):
+    """A click group whose subcommands are only imported when needed.
+
+    `lazy_subcommands` maps command names to the dotted path of the command
+    object, e.g. `{"mysql": "derex.runner.cli.mysql.mysql"}`.
+    Commands registered by plugins under the `plugins_group` entry point group
+    are only loaded when a command can't be found otherwise, or when all
+    commands need to be listed.
+    """
+
+    def __init__(
+        self,
+        *args,
+        lazy_subcommands: Optional[Dict[str, str]] = None,
+        plugins_group: Optional[str] = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands or {}
+        self.plugins_group = plugins_group
+        self._plugins_loaded = False
+
+    def list_commands(self, ctx: click.Context) -> List[str]:
+        self._load_plugins()
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_subcommands))
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> Optional[click.Command]:
+        if cmd_name in self.lazy_subcommands and cmd_name not in self.commands:
+            self._load_lazy_subcommand(cmd_name)
+        command = super().get_command(ctx, cmd_name)
+        if command is None and not self._plugins_loaded:
+            self._load_plugins()
+            command = super().get_command(ctx, cmd_name)
+        return command
+
+    def _load_lazy_subcommand(self, cmd_name: str):
+        module_name, _, attribute = self.lazy_subcommands[cmd_name].rpartition(".")
+        command = getattr(import_module(module_name), attribute)
+        self.add_command(command, cmd_name)
+
+    def _load_plugins(self):
+        """Register the commands exposed by plugins, like `click_plugins.with_plugins`
+        would do.
+        """
+        if self._plugins_loaded or not self.plugins_group:
+            return
+        self._plugins_loaded = True
+
+        from click_plugins.core import BrokenCommand
+
+        import importlib_metadata
+
+        for entry_point in importlib_metadata.entry_points().select(
+            group=self.plugins_group
+        ):
+            try:
+                self.add_command(entry_point.load())
+            except Exception:
+                # Catch this so a busted plugin doesn't take down the CLI.
+                self.add_command(BrokenCommand(entry_point.name))
+
+
+class LazyChoice(click.Choice):
+    """A `click.Choice` whose choices are computed by the given function
+    the first time they're needed, instead of when the command is defined.
+    """
+
+    def __init__(
+        self, get_choices: Callable[[], Optional[Iterable[str]]], case_sensitive=True
+    ):
+        self.get_choices = get_choices
+        self._choices: Optional[List[str]] = None
+        self.case_sensitive = case_sensitive
+
+    @property  # type: ignore
+    def choices(self) -> List[str]:
+        if self._choices is None:
+            self._choices = list(self.get_choices() or ())
+        return self._choices
+
+    @choices.setter
+    def choices(self, value):
+        self._choices = list(value)
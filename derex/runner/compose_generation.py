@@ -7,6 +7,7 @@ They are invoked thanks to the `@hookimpl` call to the pluggy plugin system.
 The functions have to be reachable under the common name `ddc_project_options`
 so a class is put in place to hold each of them.
 """
+from derex.runner import __version__
 from derex.runner import hookimpl
 from derex.runner.constants import DDC_ADMIN_PATH
 from derex.runner.constants import DDC_PROJECT_TEMPLATE_PATH
@@ -22,16 +23,20 @@ from derex.runner.local_appdir import ensure_dir
 from derex.runner.project import Project
 from derex.runner.secrets import DerexSecrets
 from derex.runner.secrets import get_secret
+from derex.runner.template_utils import get_template
 from derex.runner.utils import asbool
 from distutils import dir_util
-from jinja2 import Template
 from pathlib import Path
 from typing import Dict
 from typing import List
 from typing import Union
 
+import derex.runner.secrets
+import hashlib
+import json
 import logging
 import os
+import time
 
 
 logger = logging.getLogger(__name__)
@@ -114,20 +119,79 @@ class LocalProjectRunmode:
         return {"options": options, "name": "local-project-runmode", "priority": "_end"}
 
 
+def get_project_compose_fingerprint(project: Project, template_text: str) -> str:
+    """Return a digest of everything the project docker-compose template
+    depends on: if it did not change, the previously generated file can be reused.
+    Secrets are accounted for through a digest of the master secret, so
+    that they don't need to be derived.
+    """
+    fingerprint = {
+        "derex_version": __version__,
+        "template": template_text,
+        "config": project.config,
+        "secrets_config": project.secrets_config,
+        "master_secret": hashlib.sha256(
+            derex.runner.secrets.MASTER_SECRET.encode()
+        ).hexdigest(),
+        "runmode": project.runmode.name,
+        "settings": project.settings.value,
+        "settings_directory": str(project.settings_directory_path()),
+        "docker_image_name": project.docker_image_name,
+        "openedx_customizations": [
+            str(path) for path in project.get_openedx_customizations()
+        ],
+        "requirements_volumes": project.requirements_volumes,
+        "directories": [
+            str(getattr(project, f"{name}_dir"))
+            for name in (
+                "requirements",
+                "openedx_customizations",
+                "fixtures",
+                "themes",
+                "translations",
+            )
+        ],
+        "wsgi_py_path": str(WSGI_PY_PATH),
+        "derex_django_path": str(DEREX_DJANGO_PATH),
+    }
+    return hashlib.sha256(
+        json.dumps(fingerprint, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
 def generate_ddc_project_compose(project: Project) -> Path:
     """This function is called every time ddc-project is run.
     It assembles a docker-compose file from the given configuration.
-    It should execute as fast as possible.
+    It should execute as fast as possible: if nothing changed since the
+    last time it was run, the file is not generated again.
     """
+    start = time.perf_counter()
     project_compose_path = project.private_filepath("docker-compose.yml")
-    template_path = DDC_PROJECT_TEMPLATE_PATH
-    tmpl = Template(template_path.read_text())
+    fingerprint_path = project.private_filepath("docker-compose.yml.fingerprint")
+    template_text = DDC_PROJECT_TEMPLATE_PATH.read_text()
+    fingerprint = get_project_compose_fingerprint(project, template_text)
+    if (
+        project_compose_path.is_file()
+        and fingerprint_path.is_file()
+        and fingerprint_path.read_text() == fingerprint
+    ):
+        logger.debug(
+            f"Reused {project_compose_path} "
+            f"(checked in {time.perf_counter() - start:.3f}s)"
+        )
+        return project_compose_path
+
+    tmpl = get_template(DDC_PROJECT_TEMPLATE_PATH.name)
     text = tmpl.render(
         project=project,
         wsgi_py_path=WSGI_PY_PATH,
         derex_django_path=DEREX_DJANGO_PATH,
     )
     project_compose_path.write_text(text)
+    fingerprint_path.write_text(fingerprint)
+    logger.debug(
+        f"Generated {project_compose_path} in {time.perf_counter() - start:.3f}s"
+    )
     return project_compose_path
 
 
@@ -137,9 +201,7 @@ def generate_ddc_test_compose(project: Project) -> Path:
     It should execute as fast as possible.
     """
     test_compose_path = project.private_filepath("docker-compose-test.yml")
-    template_path = DDC_TEST_TEMPLATE_PATH
-
-    tmpl = Template(template_path.read_text())
+    tmpl = get_template(DDC_TEST_TEMPLATE_PATH.name)
     text = tmpl.render(project=project)
     test_compose_path.write_text(text)
     return test_compose_path
@@ -158,7 +220,7 @@ def generate_ddc_services_compose() -> Path:
         verbose=1,
     )
     # Compile the mailslurper template to include the mysql password
-    tmpl = Template(MAILSLURPER_JSON_TEMPLATE.read_text())
+    tmpl = get_template(MAILSLURPER_JSON_TEMPLATE.name)
     MYSQL_ROOT_PASSWORD = get_secret(DerexSecrets.mysql)
     text = tmpl.render(MYSQL_ROOT_PASSWORD=MYSQL_ROOT_PASSWORD)
     (local_path.parent / MAILSLURPER_JSON_TEMPLATE.name.replace(".j2", "")).write_text(
@@ -167,7 +229,7 @@ def generate_ddc_services_compose() -> Path:
 
     # Compile the docker compose yaml template
     ensure_dir(local_path)
-    tmpl = Template(DDC_SERVICES_YML_PATH.read_text())
+    tmpl = get_template(DDC_SERVICES_YML_PATH.name)
     text = tmpl.render(
         MINIO_SECRET_KEY=get_secret(DerexSecrets.minio),
         MONGODB_ROOT_USERNAME=MONGODB_ROOT_USER,
@@ -1,6 +1,27 @@
+from compose.cli.command import project_from_options
+from compose.cli.errors import ConnectionError as ComposeConnectionError
+from compose.cli.errors import handle_connection_errors
+from compose.cli.errors import UserError
+from compose.cli.main import dispatch
 from compose.cli.main import main
+from compose.cli.main import perform_command
+from compose.cli.main import TopLevelCommand
+from compose.config.errors import ConfigurationError
+from compose.errors import StreamParseError
+from compose.progress_stream import StreamOutputError
+from compose.project import NoSuchService
+from compose.project import Project as ComposeProjectConfig
+from compose.project import ProjectError
+from compose.service import BuildError
+from compose.service import NeedsBuildError
+from compose.service import OperationFailedError
 from contextlib import contextmanager
+from typing import Callable
+from typing import Dict
+from typing import Iterable
 from typing import List
+from typing import Optional
+from typing import Tuple
 
 import click
 import derex  # noqa  # This is ugly, but makes mypy and flake8 happy and still performs type checks
@@ -32,6 +53,113 @@ def run_docker_compose(
         sys.argv = system_argv
 
 
+def parse_compose_argv(compose_argv: List[str]) -> Tuple[Dict, Callable, Dict]:
+    """Parse docker-compose arguments the way `docker-compose` does, setting up
+    its console logging too. Return a 3-tuple `(options, handler, command_options)`
+    where `handler` is the `TopLevelCommand` method implementing the command.
+    """
+    system_argv = sys.argv
+    try:
+        sys.argv = ["docker-compose"] + compose_argv
+        return dispatch().args
+    finally:
+        sys.argv = system_argv
+
+
+def get_compose_error_message(exc: Exception) -> Optional[str]:
+    """Return the message docker-compose prints when the given exception
+    makes it fail, or None if docker-compose does not handle it.
+    """
+    if isinstance(
+        exc,
+        (
+            ConfigurationError,
+            NoSuchService,
+            OperationFailedError,
+            ProjectError,
+            UserError,
+        ),
+    ):
+        return exc.msg
+    if isinstance(exc, BuildError):
+        reason = f": {exc.reason}" if exc.reason else ""
+        return f"Service '{exc.service.name}' failed to build{reason}"
+    if isinstance(exc, NeedsBuildError):
+        return (
+            f"Service '{exc.service.name}' needs to be built, "
+            "but --no-build was passed."
+        )
+    if isinstance(exc, (StreamOutputError, StreamParseError)):
+        return str(exc)
+    if isinstance(exc, ComposeConnectionError):
+        # Details were already logged by handle_connection_errors
+        return "Could not connect to the docker daemon"
+    return None
+
+
+class ComposeProject:
+    """A docker-compose project defined by docker-compose global options
+    (like `--project-name` and `-f`), to run several docker-compose commands
+    in the same process.
+
+    The compose files are loaded and validated when the first command is run,
+    and the loaded project is reused by the following ones.
+    Failing commands raise a RuntimeError.
+
+    .. code-block:: python
+
+        compose_project = ComposeProject(["--project-name", "derex_services", "-f", "services.yml"])
+        compose_project.run(["--rm", "minio", "sh", "-c", "true"])
+        compose_project.up(["-d", "minio"])
+    """
+
+    def __init__(self, options_argv: List[str], dry_run: bool = False):
+        self.options_argv = list(options_argv)
+        self.dry_run = dry_run
+        self._project: Optional[ComposeProjectConfig] = None
+
+    def command(self, argv: List[str]):
+        """Run the docker-compose command with the given arguments,
+        for instance `["logs", "-f"]`.
+        """
+        compose_argv = ["docker-compose"] + self.options_argv + argv
+        if self.dry_run:
+            click.echo("Would have run:\n")
+            click.echo(click.style(" ".join(compose_argv), fg="blue"))
+            return
+        click.echo(f'Running\n{" ".join(compose_argv)}', err=True)
+        options, handler, command_options = parse_compose_argv(compose_argv[1:])
+        try:
+            with exit_cm():
+                if options["COMMAND"] in ("config", "help", "version"):
+                    # These commands don't act on a loaded project
+                    perform_command(options, handler, command_options)
+                    return
+                if self._project is None:
+                    self._project = project_from_options(".", options)
+                command = TopLevelCommand(self._project, options=options)
+                with handle_connection_errors(self._project.client):
+                    handler(command, command_options)
+        except Exception as exc:
+            message = get_compose_error_message(exc)
+            if message is None:
+                raise
+            logger.error(message)
+            raise RuntimeError(message) from exc
+
+    def up(self, argv: Iterable[str] = ()):
+        """Run `docker-compose up` with the given arguments."""
+        self.command(["up", *argv])
+
+    def run(self, argv: Iterable[str] = ()):
+        """Run `docker-compose run` with the given arguments."""
+        self.command(["run", *argv])
+
+    def exec(self, argv: Iterable[str] = ()):
+        """Run `docker-compose exec` with the given arguments."""
+        self.command(["exec", *argv])
+
+
 @contextmanager
 def exit_cm():
     # Context manager to monkey patch sys.exit calls
@@ -3,12 +3,14 @@
 These wrappers invoke `docker-compose` functions to get their job done.
 They put a `docker.compose.yml` file in place based on user configuration.
 """
+from derex.runner.compose_utils import ComposeProject
 from derex.runner.compose_utils import run_docker_compose
 from derex.runner.docker_utils import ensure_volumes_present
 from derex.runner.docker_utils import is_docker_working
-from derex.runner.docker_utils import wait_for_service
+from derex.runner.docker_utils import VOLUMES
+from derex.runner.docker_utils import wait_for_services
 from derex.runner.logging_utils import setup_logging
-from derex.runner.plugins import setup_plugin_manager
+from derex.runner.plugins import get_plugin_manager
 from derex.runner.plugins import sort_and_validate_plugins
 from derex.runner.project import DebugBaseImageProject
 from derex.runner.project import Project
@@ -76,12 +78,15 @@ def ddc_project():
     # If trying to start up containers, first check that needed services are running
     is_start_cmd = any(param in compose_args for param in ["up", "start"])
     if is_start_cmd:
-        for service in ["mysql", "mongodb", "rabbitmq"]:
-            try:
-                wait_for_service(service)
-            except (TimeoutError, RuntimeError, NotImplementedError) as exc:
-                click.echo(click.style(str(exc), fg="red"))
-                sys.exit(1)
+        try:
+            latencies = wait_for_services(project.required_services)
+        except (TimeoutError, RuntimeError, NotImplementedError) as exc:
+            click.echo(click.style(str(exc), fg="red"))
+            sys.exit(1)
+        logger.info(
+            "Services ready: "
+            + ", ".join(f"{name} ({secs:.2f}s)" for name, secs in latencies.items())
+        )
     run_ddc_project(list(compose_args), project, dry_run=dry_run, exit_afterwards=True)
 
 
@@ -105,14 +110,26 @@ def run_ddc_services(
 
     Used by ddc-services cli command.
     """
-    ensure_volumes_present()
-    plugins_argv = sort_and_validate_plugins(
-        setup_plugin_manager().hook.ddc_services_options()
-    )
-    compose_argv = plugins_argv + argv
+    compose_argv = get_ddc_services_argv() + argv
     run_docker_compose(compose_argv, dry_run, exit_afterwards)
 
 
+def get_ddc_services_argv() -> List[str]:
+    """Return the docker-compose arguments added by plugins for the system
+    services, making sure the docker volumes they need are present.
+    """
+    plugin_manager = get_plugin_manager()
+    ensure_volumes_present(VOLUMES.union(*plugin_manager.hook.ddc_services_volumes()))
+    return sort_and_validate_plugins(plugin_manager.hook.ddc_services_options())
+
+
+def get_ddc_services_compose_project(dry_run: bool = False) -> ComposeProject:
+    """Return a ComposeProject for the system services, to run several
+    docker-compose commands loading the compose files only once.
+    """
+    return ComposeProject(get_ddc_services_argv(), dry_run=dry_run)
+
+
 def run_ddc_project(
     argv: List[str],
     project: Project,
@@ -125,13 +142,26 @@ def run_ddc_project(
 
     Used by ddc-project cli command.
     """
-    plugins_argv = sort_and_validate_plugins(
-        setup_plugin_manager().hook.ddc_project_options(project=project),
-    )
-    compose_argv = plugins_argv + argv
+    compose_argv = get_ddc_project_argv(project) + argv
     run_docker_compose(compose_argv, dry_run, exit_afterwards)
 
 
+def get_ddc_project_argv(project: Project) -> List[str]:
+    """Return the docker-compose arguments added by plugins for the given project."""
+    return sort_and_validate_plugins(
+        get_plugin_manager().hook.ddc_project_options(project=project),
+    )
+
+
+def get_ddc_project_compose_project(
+    project: Project, dry_run: bool = False
+) -> ComposeProject:
+    """Return a ComposeProject for the given project, to run several
+    docker-compose commands loading the compose files only once.
+    """
+    return ComposeProject(get_ddc_project_argv(project), dry_run=dry_run)
+
+
 def run_django_script(
     project: Optional[Project], script_text: str, context: str = "lms"
 ) -> Any:
@@ -1,36 +1,59 @@
 # -coding: utf8-
 """Utility functions to deal with docker.
 """
+from concurrent.futures import ThreadPoolExecutor
 from derex.runner.secrets import DerexSecrets
 from derex.runner.secrets import get_secret
+from derex.runner.template_utils import get_directory_template_environment
 from derex.runner.utils import abspath_from_egg
-from derex.runner.utils import copydir
-from jinja2 import Environment
-from jinja2 import FileSystemLoader
+from derex.runner.utils import get_rich_console
+from derex.runner.utils import get_rich_table
 from pathlib import Path
-from python_on_whales import docker as pow_docker
 from requests.exceptions import RequestException
-from shutil import copyfile
-from shutil import copytree
+from shutil import copy2
 from shutil import rmtree
 from tempfile import mkdtemp
 from tempfile import mkstemp
 from typing import Dict
 from typing import Iterable
+from typing import Iterator
 from typing import List
 from typing import Optional
+from typing import Pattern
+from typing import Tuple
 
 import docker
 import io
 import json
 import logging
 import os
+import queue
 import re
 import tarfile
+import threading
 import time
 
 
-client = docker.from_env()
+class LazyDockerClient:
+    """Proxy to a `docker.DockerClient` instance, created the first time
+    one of its attributes is accessed.
+    This way importing this module does not need a connection to
+    the docker daemon.
+    """
+
+    _client: Optional[docker.DockerClient] = None
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            # Private attributes are looked up by introspection (e.g. by mock)
+            # and should not require a connection to docker
+            raise AttributeError(name)
+        if self._client is None:
+            self._client = docker.from_env()
+        return getattr(self._client, name)
+
+
+client = LazyDockerClient()
 logger = logging.getLogger(__name__)
 VOLUMES = {
     "derex_elasticsearch",
@@ -44,6 +67,10 @@ VOLUMES = {
     "derex_minio",
 }
 
+# Seconds during which the result of `get_running_containers` is reused
+RUNNING_CONTAINERS_CACHE_TTL = 2.0
+_running_containers_cache: Tuple[float, Dict] = (float("-inf"), {})
+
 
 def is_docker_working() -> bool:
     """Check if we can successfully connect to the docker daemon."""
@@ -61,63 +88,156 @@ def docker_has_experimental() -> bool:
     return bool(client.api.info().get("ExperimentalBuild"))
 
 
-def ensure_volumes_present():
-    """Make sure the derex network necessary for our docker-compose files to
-    work is in place.
+def ensure_volumes_present(
+    volumes: Optional[Iterable[str]] = None, max_workers: Optional[int] = None
+):
+    """Make sure the docker volumes needed by our docker-compose files are
+    in place. Defaults to the `VOLUMES` needed by the derex services.
+    Present volumes are found with a single query filtered by name,
+    and missing ones are created concurrently.
     """
-    missing = VOLUMES - {el.name for el in client.volumes.list()}
-    for volume in missing:
+    volumes = set(VOLUMES if volumes is None else volumes)
+    if not volumes:
+        return
+    # The name filter matches substrings, so names are checked again
+    present = {el.name for el in client.volumes.list(filters={"name": sorted(volumes)})}
+    missing = volumes - present
+
+    def create(volume: str):
         logger.warning("Creating docker volume '%s'", volume)
         client.volumes.create(volume)
 
+    if missing:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for _ in executor.map(create, sorted(missing)):
+                pass
+
+
+def get_service_health(service: str) -> Optional[str]:
+    """Return the health status of the given service container
+    (e.g. "starting" or "healthy").
+    Raises RuntimeError if the service container cannot be found or is not
+    in a running state, and NotImplementedError if the service doesn't
+    define any healthcheck.
+    """
+    try:
+        container_info = client.api.inspect_container(service)
+    except docker.errors.NotFound:
+        raise RuntimeError(
+            f"{service} service not found.\n"
+            "Maybe you forgot to run\n"
+            "ddc-services up -d"
+        )
+    container_status = container_info.get("State").get("Status")
+    if container_status not in ["running", "restarting"]:
+        raise RuntimeError(
+            f'Service {service} is not running (status="{container_status}")\n'
+            "Maybe you forgot to run\n"
+            "ddc-services up -d"
+        )
+    try:
+        return container_info.get("State").get("Health").get("Status")
+    except AttributeError:
+        raise NotImplementedError(
+            f"{service} service doesn't declare any healthcheck.\n"
+        )
+
 
 def wait_for_service(service: str, max_seconds: int = 35) -> int:
     """With a freshly created container services might need a bit of time to start.
     This functions waits up to max_seconds seconds for the healthcheck on the container
     to report as healthy.
+    Health changes are received from the docker events stream; if events are not
+    available the container is polled with an exponential backoff.
     Returns an exit code 0 or raises an exception:
 
     * RuntimeError is raised if the service container cannot be found or is not in a running state
     * NotImplementedError is raised if the service doesn't define any healthcheck
     * TimeoutError is raised if the healtcheck doesn't report as healthy in the `max_seconds` amount of time
     """
-    for i in range(max_seconds):
-        try:
-            container_info = client.api.inspect_container(service)
-        except docker.errors.NotFound:
-            raise RuntimeError(
-                f"{service} service not found.\n"
-                "Maybe you forgot to run\n"
-                "ddc-services up -d"
-            )
-        container_status = container_info.get("State").get("Status")
-        if container_status not in ["running", "restarting"]:
-            raise RuntimeError(
-                f'Service {service} is not running (status="{container_status}")\n'
-                "Maybe you forgot to run\n"
-                "ddc-services up -d"
-            )
+    deadline = time.monotonic() + max_seconds
+    # Events are replayed from this moment on, so that a health change
+    # happening while we inspect the container is not missed
+    since = int(time.time())
+    if get_service_health(service) == "healthy":
+        return 0
+    logger.warning(f"Waiting for {service} to be ready")
+
+    try:
+        events = client.api.events(
+            since=since,
+            until=int(time.time() + max_seconds) + 1,
+            filters={
+                "type": "container",
+                "container": service,
+                "event": ["health_status", "die", "destroy"],
+            },
+            decode=True,
+        )
         try:
-            healthcheck = container_info.get("State").get("Health").get("Status")
-        except AttributeError:
-            raise NotImplementedError(
-                f"{service} service doesn't declare any healthcheck.\n"
-            )
-        if healthcheck == "healthy":
+            for _ in events:
+                # The container state is checked again on every event,
+                # to report failures consistently
+                if get_service_health(service) == "healthy":
+                    return 0
+                if time.monotonic() >= deadline:
+                    break
+        finally:
+            events.close()
+    except (docker.errors.DockerException, RequestException) as exc:
+        logger.debug(f"Docker events not available, polling {service}: {exc}")
+
+    delay = 0.1
+    while time.monotonic() < deadline:
+        time.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+        if get_service_health(service) == "healthy":
             return 0
-        time.sleep(1)
-        logger.warning(f"Waiting for {service} to be ready")
+        delay = min(delay * 2, 2)
     raise TimeoutError(f"Can't connect to {service} service")
 
 
+def wait_for_services(
+    services: Iterable[str], max_seconds: int = 35
+) -> Dict[str, float]:
+    """Wait for all the given services to be healthy, concurrently,
+    up to `max_seconds` seconds overall.
+    As soon as all of them are healthy returns a dictionary mapping every
+    service to the number of seconds it took to be ready.
+    Otherwise the first exception raised by `wait_for_service` is raised.
+    """
+    services = list(services)
+    results: "queue.Queue[Tuple[str, float, Optional[Exception]]]" = queue.Queue()
+    start = time.monotonic()
+
+    def wait(service: str):
+        try:
+            wait_for_service(service, max_seconds)
+        except Exception as exc:
+            results.put((service, time.monotonic() - start, exc))
+        else:
+            results.put((service, time.monotonic() - start, None))
+
+    # Daemon threads are used so that a failure can be reported right away,
+    # without waiting for the other services
+    for service in services:
+        threading.Thread(target=wait, args=(service,), daemon=True).start()
+    latencies = {}
+    for _ in services:
+        service, latency, exc = results.get()
+        if exc is not None:
+            raise exc
+        logger.debug(f"Service {service} ready in {latency:.2f}s")
+        latencies[service] = latency
+    return latencies
+
+
 def check_services(services: Iterable[str], max_seconds: int = 1) -> bool:
     """Check if the specified services are running and healthy.
-    For every service it will retry for a `max_seconds` amount of time.
+    Services are checked concurrently, waiting up to `max_seconds` seconds.
     Returns False if any of the service is unhealthy, True otherwise.
     """
     try:
-        for service in services:
-            wait_for_service(service, max_seconds)
+        wait_for_services(services, max_seconds)
     except (TimeoutError, RuntimeError, NotImplementedError):
         return False
     return True
@@ -145,27 +265,119 @@ def load_dump(relpath):
     run_ddc_services(compose_args)
 
 
+# Size of the chunks a build context is streamed in, and maximum number
+# of chunks kept in memory
+BUILD_CONTEXT_CHUNK_SIZE = 64 * 1024
+BUILD_CONTEXT_QUEUE_SIZE = 64
+
+
+class _BuildContextClosed(Exception):
+    """Raised in the thread writing a build context when nobody reads it anymore."""
+
+
+class _QueueWriter:
+    """File-like object putting every written chunk in a queue.
+    Once the `stop` event is set writing raises `_BuildContextClosed`.
+    """
+
+    def __init__(self, chunks: "queue.Queue[Optional[bytes]]", stop: threading.Event):
+        self.chunks = chunks
+        self.stop = stop
+
+    def put(self, chunk: Optional[bytes]):
+        while not self.stop.is_set():
+            try:
+                self.chunks.put(chunk, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def write(self, data: bytes) -> int:
+        if data:
+            self.put(bytes(data))
+        if self.stop.is_set():
+            raise _BuildContextClosed()
+        return len(data)
+
+
+def stream_build_context(
+    dockerfile_text: str, paths: List[str], compress: bool = False
+) -> Iterator[bytes]:
+    """Generate a build context as a stream of tar chunks, optionally gzipped,
+    containing the given paths and a Dockerfile with the given text.
+    The tar archive is written by a separate thread, and at most
+    `BUILD_CONTEXT_QUEUE_SIZE` chunks are kept in memory at any time.
+    """
+    chunks: "queue.Queue[Optional[bytes]]" = queue.Queue(BUILD_CONTEXT_QUEUE_SIZE)
+    stop = threading.Event()
+    errors: List[Exception] = []
+    writer = _QueueWriter(chunks, stop)
+
+    def produce():
+        try:
+            with tarfile.open(
+                fileobj=writer,
+                mode="w|gz" if compress else "w|",
+                bufsize=BUILD_CONTEXT_CHUNK_SIZE,
+                dereference=True,
+            ) as context_tar:
+                dockerfile = dockerfile_text.encode()
+                info = tarfile.TarInfo(name="Dockerfile")
+                info.size = len(dockerfile)
+                context_tar.addfile(info, fileobj=io.BytesIO(dockerfile))
+                for path in paths:
+                    context_tar.add(path, arcname=Path(path).name)
+        except _BuildContextClosed:
+            pass
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            writer.put(None)
+
+    producer = threading.Thread(target=produce, name="derex-build-context", daemon=True)
+    producer.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        # Make the producer stop writing if the consumer stopped early
+        stop.set()
+        producer.join()
+    if errors:
+        raise errors[0]
+
+
+def is_local_docker_daemon() -> bool:
+    """Return True if the docker daemon is reached through a local
+    unix socket or named pipe.
+    """
+    return client.api.base_url.startswith(
+        ("http+docker://localhost", "http+docker://localnpipe")
+    )
+
+
 def build_image(
     dockerfile_text: str,
     paths: List[str],
     tag: str,
     tag_final: bool = False,
     extra_options: Dict = {},
+    compress: Optional[bool] = None,
 ):
     """Build a docker image. Prepares a build context (a tar stream)
     based on the `paths` argument and includes the Dockerfile text passed
     in `dockerfile_text`.
+    The context is streamed to the docker daemon while it's being created.
+    It is gzipped if `compress` is True, or if `compress` is None and the
+    docker daemon is not local.
     """
-    dockerfile = io.BytesIO(dockerfile_text.encode())
-    context = io.BytesIO()
-    context_tar = tarfile.open(fileobj=context, mode="w:gz", dereference=True)
-    info = tarfile.TarInfo(name="Dockerfile")
-    info.size = len(dockerfile_text)
-    context_tar.addfile(info, fileobj=dockerfile)
-    for path in paths:
-        context_tar.add(path, arcname=Path(path).name)
-    context_tar.close()
-    context.seek(0)
+    if compress is None:
+        compress = not is_local_docker_daemon()
+    context = stream_build_context(dockerfile_text, paths, compress=compress)
+    encoding = "gzip" if compress else None
 
     if docker_has_experimental():
         extra_options.update(dict(squash=True))
@@ -175,7 +387,11 @@ def build_image(
         )
 
     output = client.api.build(
-        fileobj=context, custom_context=True, encoding="gzip", tag=tag, **extra_options
+        fileobj=context,
+        custom_context=True,
+        encoding=encoding,
+        tag=tag,
+        **extra_options,
     )
     for lines in output:
         for line in re.split(rb"\r\n|\n", lines):
@@ -189,11 +405,188 @@ def build_image(
                 print(line_decoded.get("error", ""))
             if "aux" in line_decoded:
                 print(f'Built image: {line_decoded["aux"]["ID"]}')
+    image_index.invalidate(tag)
     if tag_final:
         final_tag = tag.rpartition(":")[0] + ":latest"
-        for image in client.api.images():
-            if image.get("RepoTags") and tag in image["RepoTags"]:
-                client.api.tag(image["Id"], final_tag)
+        image = image_index.get(tag)
+        if image is not None:
+            client.api.tag(image["Id"], final_tag)
+            image_index.invalidate(final_tag)
+
+
+class DockerIgnore:
+    """Match paths relative to a build context against the patterns
+    of a `.dockerignore` file, following the docker rules:
+    `*` and `?` do not match `/`, `**` matches any number of directories,
+    patterns starting with `!` re-include paths excluded by previous
+    patterns and the last matching pattern wins.
+    Excluding a directory excludes everything inside it.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.rules: List[Tuple[Pattern, bool]] = []
+        for pattern in patterns:
+            pattern = pattern.strip()
+            if not pattern or pattern.startswith("#"):
+                continue
+            negated = pattern.startswith("!")
+            pattern = os.path.normpath(pattern.lstrip("!").strip().lstrip("/"))
+            if pattern == ".":
+                continue
+            self.rules.append((self._translate(pattern), negated))
+
+    @classmethod
+    def from_file(cls, path: Path) -> "DockerIgnore":
+        """Load the patterns from the given file, if it exists."""
+        try:
+            return cls(path.read_text().splitlines())
+        except FileNotFoundError:
+            return cls([])
+
+    @property
+    def has_exceptions(self) -> bool:
+        """True if any pattern re-includes paths."""
+        return any(negated for _, negated in self.rules)
+
+    def is_excluded(self, relative_path: str) -> bool:
+        """Return True if the given path (with forward slashes) should be
+        left out of the build context.
+        """
+        excluded = False
+        for regex, negated in self.rules:
+            if regex.match(relative_path):
+                excluded = not negated
+        return excluded
+
+    @staticmethod
+    def _translate(pattern: str) -> Pattern:
+        regex = ""
+        i = 0
+        while i < len(pattern):
+            if pattern.startswith("**/", i):
+                regex += "(?:.*/)?"
+                i += 3
+            elif pattern.startswith("**", i):
+                regex += ".*"
+                i += 2
+            elif pattern[i] == "*":
+                regex += "[^/]*"
+                i += 1
+            elif pattern[i] == "?":
+                regex += "[^/]"
+                i += 1
+            else:
+                regex += re.escape(pattern[i])
+                i += 1
+        return re.compile(f"{regex}(?:/.*)?$")
+
+
+def iter_context_entries(
+    path: Path, ignore: DockerIgnore
+) -> Iterator[Tuple[str, str, bool]]:
+    """Walk the given directory following symlinks, and yield a 3-tuple
+    `(source, relative_path, is_dir)` for every entry to include in a build
+    context. Relative paths start with the name of the directory.
+    Symlinks pointing to one of the directories they're in are skipped.
+    """
+    to_visit = [(path.name, str(path), frozenset([os.path.realpath(path)]))]
+    yield str(path), path.name, True
+    while to_visit:
+        prefix, directory, ancestors = to_visit.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                relative_path = f"{prefix}/{entry.name}"
+                excluded = ignore.is_excluded(relative_path)
+                if entry.is_dir():
+                    if excluded and not ignore.has_exceptions:
+                        continue
+                    realpath = os.path.realpath(entry.path)
+                    if realpath in ancestors:
+                        continue
+                    to_visit.append((relative_path, entry.path, ancestors | {realpath}))
+                    if not excluded:
+                        yield entry.path, relative_path, True
+                elif entry.is_file() and not excluded:
+                    yield entry.path, relative_path, False
+
+
+def link_file(source: str, destination: str):
+    """Hardlink the source file (following symlinks) to the destination.
+    An existing destination is unlinked first, so that a file linked
+    from elsewhere is never modified.
+    Raises OSError if the file can't be linked (e.g. the source and
+    destination are on different filesystems).
+    """
+    try:
+        os.link(source, destination)
+    except FileExistsError:
+        os.unlink(destination)
+        os.link(source, destination)
+
+
+def copy_file(source: str, destination: str):
+    """Copy the source file to the destination, together with its metadata.
+    An existing destination is unlinked first, like in `link_file`.
+    """
+    if os.path.lexists(destination):
+        os.unlink(destination)
+    copy2(source, destination)
+
+
+def prepare_build_context(
+    paths: List[Path], context_dir: Path, max_workers: Optional[int] = None
+) -> Tuple[int, int]:
+    """Populate a build context directory with the given paths, each one
+    under its own name. Paths with the same name are merged, later ones
+    overwriting files of earlier ones.
+    Files are hardlinked into the context when possible. Files that can't
+    be linked are copied on a thread pool. Files excluded by a `.dockerignore`
+    file in the directory containing each path are left out.
+    Returns a 2-tuple with the number of files linked and copied.
+    """
+    files: Dict[str, str] = {}
+    directories = set()
+    for path in paths:
+        ignore = DockerIgnore.from_file(path.parent / ".dockerignore")
+        if path.is_dir():
+            for source, relative_path, is_dir in iter_context_entries(path, ignore):
+                destination = os.path.join(context_dir, relative_path)
+                if is_dir:
+                    directories.add(destination)
+                else:
+                    # The parent directory may be excluded, if the file
+                    # is included by a `.dockerignore` exception
+                    directories.add(os.path.dirname(destination))
+                    files[destination] = source
+        elif path.is_file() and not ignore.is_excluded(path.name):
+            files[os.path.join(context_dir, path.name)] = str(path)
+
+    for directory in sorted(directories):
+        os.makedirs(directory, exist_ok=True)
+    to_copy = []
+    for destination, source in files.items():
+        try:
+            link_file(source, destination)
+        except OSError:
+            to_copy.append((source, destination))
+    if to_copy:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for _ in executor.map(lambda item: copy_file(*item), to_copy):
+                pass
+    return len(files) - len(to_copy), len(to_copy)
+
+
+def get_build_context_parent(paths: List[Path]) -> Optional[Path]:
+    """Return a directory where to create a build context, so that files
+    can be hardlinked into it: the private directory of the project
+    containing the paths, if any. Returns None to use the default temporary
+    directory.
+    """
+    for path in paths:
+        private_dir = path.parent / ".derex"
+        if private_dir.is_dir() and os.access(private_dir, os.W_OK):
+            return private_dir
+    return None
 
 
 def buildx_image(
@@ -209,39 +602,37 @@ def buildx_image(
     cache_tag: bool,
     build_args: Dict = {},
 ):
-    # This gets imported here to avoid a circular import
+    # Project gets imported here to avoid a circular import,
+    # and python_on_whales is slow to import and only needed here
     from derex.runner.project import Project
+    from python_on_whales import docker as pow_docker
 
-    tempdir = Path(mkdtemp(prefix="derex-build-"))
+    tempdir = Path(mkdtemp(prefix="derex-build-", dir=get_build_context_parent(paths)))
     try:
         _, dockerfile_str_path = mkstemp(prefix="Dockerfile-", dir=tempdir)
         dockerfile = Path(dockerfile_str_path)
         dockerfile.write_text(dockerfile_text)
 
+        start = time.perf_counter()
+        linked, copied = prepare_build_context(paths, tempdir)
+        logger.debug(
+            f"Build context prepared in {time.perf_counter() - start:.3f}s "
+            f"({linked} files linked, {copied} copied)"
+        )
+
         for path in paths:
-            destination_tmp_dir_path = Path(tempdir / path.name)
-            if path.is_dir():
-                try:
-                    copytree(path, destination_tmp_dir_path)
-                except FileExistsError:
-                    copydir(str(path), str(destination_tmp_dir_path))
-            if path.is_file():
-                copyfile(path, destination_tmp_dir_path)
-
-                if path.name.endswith(".j2"):
-                    jinja_environment = Environment(
-                        loader=FileSystemLoader(destination_tmp_dir_path.parent)
-                    )
-                    template = jinja_environment.get_template(
-                        destination_tmp_dir_path.name
-                    )
-                    rendered_template = template.render(
-                        project=Project(),
-                    )
-                    Path(
-                        destination_tmp_dir_path.parent
-                        / destination_tmp_dir_path.name.replace(".j2", "")
-                    ).write_text(rendered_template)
+            if path.is_file() and path.name.endswith(".j2"):
+                template = get_directory_template_environment(
+                    path.parent.resolve()
+                ).get_template(path.name)
+                rendered_template = template.render(
+                    project=Project(),
+                )
+                rendered_path = tempdir / path.name.replace(".j2", "")
+                # The destination might be linked to a file outside the context
+                if rendered_path.exists():
+                    rendered_path.unlink()
+                rendered_path.write_text(rendered_template)
 
         cache_from_arg: Optional[Dict] = None
         cache_to_arg: Optional[Dict] = None
@@ -266,43 +657,225 @@ def buildx_image(
         )
     finally:
         rmtree(tempdir)
+        for tag in tags:
+            image_index.invalidate(tag)
+
+
+class PullProgress:
+    """Aggregate the progress of concurrent image pulls.
+    Layers shared between images are downloaded once by the docker daemon,
+    so they are only accounted to the image that started downloading them.
+    """
+
+    def __init__(self):
+        self.layers: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def update(self, image_name: str, event: Dict):
+        """Update the progress with an event from the docker pull stream."""
+        layer_id = str(event.get("id"))
+        status = event.get("status")
+        detail = event.get("progressDetail") or {}
+        with self._lock:
+            if status == "Downloading" and detail.get("total"):
+                layer = self.layers.setdefault(
+                    layer_id, {"image": image_name, "total": detail["total"]}
+                )
+                if layer["image"] == image_name:
+                    layer["current"] = detail.get("current", 0)
+            elif status == "Download complete" and layer_id in self.layers:
+                layer = self.layers[layer_id]
+                if layer["image"] == image_name:
+                    layer["current"] = layer["total"]
+
+    def get_bytes(self, image_name: str) -> Tuple[int, int]:
+        """Return the bytes downloaded and to download for the given image."""
+        with self._lock:
+            layers = [
+                layer for layer in self.layers.values() if layer["image"] == image_name
+            ]
+        return (
+            sum(layer.get("current", 0) for layer in layers),
+            sum(layer["total"] for layer in layers),
+        )
+
+
+def pull_images(image_names: List[str], max_workers: int = 4) -> Dict[str, Dict]:
+    """Pull the given images to the local docker daemon, up to `max_workers`
+    at a time, showing their aggregated progress.
+    Returns a dictionary mapping every image to the number of `bytes`
+    downloaded for it and the `seconds` it took.
+    If any pull fails the first error is raised once all pulls are done.
+    """
+    from rich import filesize
+    from rich.progress import BarColumn
+    from rich.progress import DownloadColumn
+    from rich.progress import Progress
+    from rich.progress import TransferSpeedColumn
+
+    image_names = list(dict.fromkeys(image_names))
+    pull_progress = PullProgress()
+    stats: Dict[str, Dict] = {}
+
+    with Progress(
+        "[progress.description]{task.description}",
+        BarColumn(),
+        DownloadColumn(),
+        TransferSpeedColumn(),
+        console=get_rich_console(),
+    ) as progress:
+
+        def pull(image_name: str):
+            task = progress.add_task(image_name, total=None)
+            start = time.monotonic()
+            try:
+                for event in client.api.pull(image_name, stream=True, decode=True):
+                    if "error" in event:
+                        raise docker.errors.APIError(event["error"])
+                    pull_progress.update(image_name, event)
+                    completed, total = pull_progress.get_bytes(image_name)
+                    progress.update(task, completed=completed, total=total or None)
+            finally:
+                image_index.invalidate(image_name)
+            completed, total = pull_progress.get_bytes(image_name)
+            progress.update(task, completed=completed, total=total)
+            stats[image_name] = {
+                "bytes": completed,
+                "seconds": time.monotonic() - start,
+            }
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(pull, image_name) for image_name in image_names]
+        errors = [
+            exc for exc in (future.exception() for future in futures) if exc is not None
+        ]
+
+    if stats:
+        table = get_rich_table("Image", "Downloaded", "Time", "Speed", show_lines=True)
+        for image_name in image_names:
+            if image_name not in stats:
+                continue
+            downloaded, seconds = (
+                stats[image_name]["bytes"],
+                stats[image_name]["seconds"],
+            )
+            table.add_row(
+                image_name,
+                filesize.decimal(downloaded),
+                f"{seconds:.1f}s",
+                f"{filesize.decimal(int(downloaded / seconds) if seconds else 0)}/s",
+            )
+        get_rich_console().print(table)
+
+    if errors:
+        raise errors[0]
+    return stats
+
+
+def split_image_tag(image_tag: str) -> Tuple[str, str]:
+    """Split an image reference like `registry:5000/name:tag` into
+    its repository and tag. The tag defaults to `latest`.
+    """
+    repository, _, tag = image_tag.rpartition(":")
+    if not repository or "/" in tag:
+        return image_tag, "latest"
+    return repository, tag
 
 
-def pull_images(image_names: List[str]):
-    """Pull the given image to the local docker daemon."""
-    # digest = client.api.inspect_distribution(image_name)["Descriptor"]["digest"]
-    for image_name in image_names:
-        print(f"Pulling image {image_name}")
-        for out in client.api.pull(image_name, stream=True, decode=True):
-            if "progress" in out:
-                print(f'{out["id"]}: {out["progress"]}', end="\r")
+class ImageIndex:
+    """A per-process index of the images in the local docker repository.
+
+    Images are indexed by repository: the first time a tag of a repository is
+    looked up the images of that repository are listed with a single filtered
+    API call. The index needs to be invalidated when images are built,
+    pulled or tagged.
+    """
+
+    def __init__(self):
+        self._repositories: Dict[str, Dict[str, Dict]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, image_tag: str) -> Optional[Dict]:
+        """Return a dictionary with the `Id` and `Created` keys for the image
+        with the given tag, or None if it's not present locally.
+        """
+        repository, tag = split_image_tag(image_tag)
+        with self._lock:
+            images = self._repositories.get(repository)
+        if images is None:
+            images = self._list_repository(repository)
+            with self._lock:
+                self._repositories[repository] = images
+        return images.get(f"{repository}:{tag}")
+
+    def _list_repository(self, repository: str) -> Dict[str, Dict]:
+        images: Dict[str, Dict] = {}
+        for image in client.api.images(name=repository):
+            for repo_tag in image.get("RepoTags") or []:
+                existing = images.get(repo_tag)
+                if existing is None or image["Created"] > existing["Created"]:
+                    images[repo_tag] = {"Id": image["Id"], "Created": image["Created"]}
+        return images
+
+    def invalidate(self, image_tag: Optional[str] = None):
+        """Forget the images of the repository of the given image,
+        or all images if no image is given.
+        """
+        with self._lock:
+            if image_tag is None:
+                self._repositories.clear()
             else:
-                print(out["status"])
+                self._repositories.pop(split_image_tag(image_tag)[0], None)
+
+
+image_index = ImageIndex()
 
 
 def image_exists(needle: str) -> bool:
     """If the given image tag exist in the local docker repository, return True."""
-    images = client.api.images()
-    images.sort(key=lambda el: el["Created"], reverse=True)
-    for image in images:
-        if "RepoTags" not in image or not image["RepoTags"]:
-            continue
-        if needle in image["RepoTags"]:
-            return True
-    return False
+    return image_index.get(needle) is not None
 
 
 class BuildError(RuntimeError):
     """An error occurred while building a docker image"""
 
 
-def get_running_containers() -> Dict:
-    if "derex" in [network.name for network in client.networks.list()]:
-        return {
-            container.name: client.api.inspect_container(container.name)
-            for container in client.networks.get("derex").containers
-        }
-    return {}
+def inspect_container(name: str) -> Optional[Dict]:
+    """Return the low level information about the container with the given name,
+    or None if it does not exist (anymore).
+    """
+    try:
+        return client.api.inspect_container(name)
+    except docker.errors.NotFound:
+        return None
+
+
+def get_running_containers(max_workers: Optional[int] = None) -> Dict:
+    """Return a dictionary mapping the names of the running containers
+    attached to the `derex` network to their low level information.
+
+    The containers are listed with a single API call and inspected concurrently.
+    The result is reused for `RUNNING_CONTAINERS_CACHE_TTL` seconds.
+    """
+    global _running_containers_cache
+    timestamp, containers = _running_containers_cache
+    if time.monotonic() - timestamp < RUNNING_CONTAINERS_CACHE_TTL:
+        return containers
+
+    names = [
+        container["Names"][0].lstrip("/")
+        for container in client.api.containers(filters={"network": "derex"})
+    ]
+    if len(names) < 2:
+        inspected = [inspect_container(name) for name in names]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            inspected = list(executor.map(inspect_container, names))
+    containers = {
+        name: info for name, info in zip(names, inspected) if info is not None
+    }
+    _running_containers_cache = (time.monotonic(), containers)
+    return containers
 
 
 def get_exposed_container_names() -> List:
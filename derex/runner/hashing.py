@@ -0,0 +1,216 @@
+"""Utilities to compute and cache hashes of project directories.
+
+Hashing the directories of a project is needed to compute the tags of the
+project docker images, and this happens every time `ddc-project` is run.
+
+Directories are walked recursively and every file is hashed on its own,
+streaming its contents in chunks (or through `mmap` for large files) on a
+thread pool. File digests are then combined into a Merkle-style digest
+of the directory tree, which does not depend on the order files were
+hashed in.
+
+To keep things fast a persistent index is kept in the project private
+directory: a file is only hashed again if its stat information changed.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+
+
+logger = logging.getLogger(__name__)
+
+HASH_INDEX_VERSION = 2
+
+#: Size of the chunks read when hashing regular files
+CHUNK_SIZE = 1024 * 1024
+
+#: Files larger than this are hashed through mmap
+MMAP_THRESHOLD = 16 * 1024 * 1024
+
+IGNORED_DIRS = frozenset(("__pycache__",))
+IGNORED_SUFFIXES = (".pyc",)
+
+
+def get_file_hash(path: Path) -> str:
+    """Return the sha256 hex digest of the file at the given path.
+    The file is never loaded in memory as a whole.
+    """
+    hasher = hashlib.sha256()
+    with path.open("rb") as fh:
+        size = os.fstat(fh.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                hasher.update(mapped)
+        else:
+            for chunk in iter(lambda: fh.read(CHUNK_SIZE), b""):
+                hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def iter_dir_files(path: Path) -> Iterator[Tuple[str, Path, os.stat_result]]:
+    """Walk the given directory recursively, and yield a 3-tuple
+    `(relative_path, path, stat_result)` for every file that should be hashed.
+    Symlinks are followed, unless they point to one of the directories
+    they're in (which would make us loop forever).
+    """
+    to_visit = [("", os.path.abspath(path), frozenset([os.path.realpath(path)]))]
+    while to_visit:
+        prefix, directory, ancestors = to_visit.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    realpath = os.path.realpath(entry.path)
+                    if entry.name not in IGNORED_DIRS and realpath not in ancestors:
+                        to_visit.append(
+                            (
+                                f"{prefix}{entry.name}/",
+                                entry.path,
+                                ancestors | {realpath},
+                            )
+                        )
+                elif entry.is_file() and not entry.name.endswith(IGNORED_SUFFIXES):
+                    yield f"{prefix}{entry.name}", Path(entry.path), entry.stat()
+
+
+def hash_files(paths: List[Path], max_workers: Optional[int] = None) -> List[str]:
+    """Hash the given files concurrently, and return their digests
+    in the same order.
+    """
+    if len(paths) < 2:
+        return [get_file_hash(path) for path in paths]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(get_file_hash, paths))
+
+
+def get_tree_hash(file_digests: Dict[str, str]) -> str:
+    """Combine a dictionary mapping relative file paths (with forward slashes)
+    to their digests into a single digest.
+    Every directory gets a digest computed from the sorted names and digests
+    of its entries, and the digest of the root directory is returned.
+    """
+    tree: Dict = {}
+    for relative_path, digest in file_digests.items():
+        *dirnames, filename = relative_path.split("/")
+        node = tree
+        for dirname in dirnames:
+            node = node.setdefault(dirname, {})
+        node[filename] = digest
+    return _get_node_hash(tree)
+
+
+def _get_node_hash(node: Dict) -> str:
+    hasher = hashlib.sha256()
+    for name in sorted(node):
+        value = node[name]
+        if isinstance(value, dict):
+            hasher.update(f"tree {name}\0{_get_node_hash(value)}\n".encode())
+        else:
+            hasher.update(f"blob {name}\0{value}\n".encode())
+    return hasher.hexdigest()
+
+
+def get_dir_hash(path: Path, max_workers: Optional[int] = None) -> str:
+    """Given a directory, return a hash of the contents of all files it contains,
+    including the ones in its subdirectories.
+    """
+    files = list(iter_dir_files(path))
+    digests = hash_files([file_path for _, file_path, _ in files], max_workers)
+    result = get_tree_hash(
+        {relative_path: digest for (relative_path, *_), digest in zip(files, digests)}
+    )
+    logger.debug(f"Hash for dir {path} ({len(files)} files) is {result}")
+    return result
+
+
+def get_file_signature(stat: os.stat_result) -> List[int]:
+    """Return the size, modification time (in nanoseconds) and inode number
+    from the given file stat result.
+    """
+    return [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+
+
+class HashIndex:
+    """A persistent cache of file hashes, stored as a JSON file.
+
+    Entries are keyed by file path and hold the digest of the file
+    together with its signature (see `get_file_signature`). Files whose
+    signature did not change are not read again.
+    Only entries for files examined since the index was loaded are saved,
+    so entries for deleted files are dropped.
+
+    .. code-block:: python
+
+        index = HashIndex(Path("/path/to/project/.derex/hash_index.json"))
+        index.get_dir_hash(Path("/path/to/project/themes"))
+        index.save()
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._entries: Dict[str, List] = {}
+        self._seen: Dict[str, List] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != HASH_INDEX_VERSION:
+            logger.debug(f"Ignoring outdated hash index {self.path}")
+            return
+        self._entries = data.get("files", {})
+
+    def get_dir_hash(self, path: Path, max_workers: Optional[int] = None) -> str:
+        """Return the hash of the given directory, as computed by
+        `get_dir_hash`, only hashing files that changed since they
+        were last examined.
+        """
+        file_digests: Dict[str, str] = {}
+        to_hash: List[Tuple[str, str, List[int], Path]] = []
+        for relative_path, file_path, stat in iter_dir_files(path):
+            key = str(file_path)
+            signature = get_file_signature(stat)
+            entry = self._entries.get(key)
+            if entry is not None and entry[:-1] == signature:
+                file_digests[relative_path] = entry[-1]
+                self._seen[key] = entry
+            else:
+                to_hash.append((relative_path, key, signature, file_path))
+
+        digests = hash_files([item[-1] for item in to_hash], max_workers)
+        for (relative_path, key, signature, _), digest in zip(to_hash, digests):
+            file_digests[relative_path] = digest
+            self._seen[key] = signature + [digest]
+            self._dirty = True
+        logger.debug(
+            f"Hashed {len(to_hash)} out of {len(file_digests)} files in dir {path}"
+        )
+        return get_tree_hash(file_digests)
+
+    def save(self):
+        """Write the index to disk, if anything changed since it was loaded.
+        Failing to write the index is not fatal: it will just be
+        recomputed next time.
+        """
+        if not self._dirty and self._seen.keys() == self._entries.keys():
+            return
+        data = {"version": HASH_INDEX_VERSION, "files": self._seen}
+        try:
+            self.path.write_text(json.dumps(data))
+        except OSError as exc:
+            logger.debug(f"Could not write hash index {self.path}: {exc}")
+            return
+        self._entries = dict(self._seen)
+        self._dirty = False
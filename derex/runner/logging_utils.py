@@ -1,11 +1,12 @@
 from derex.runner.utils import get_rich_console
-from rich.logging import RichHandler
 
 import logging
 import os
 
 
 def setup_logging():
+    from rich.logging import RichHandler
+
     loglevel = getattr(logging, os.environ.get("DEREX_LOGLEVEL", "WARN"))
     for logger in ("urllib3.connectionpool", "compose", "docker"):
         logging.getLogger(logger).setLevel(loglevel)
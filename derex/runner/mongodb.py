@@ -1,34 +1,92 @@
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
 from derex.runner.constants import MONGODB_ROOT_USER
 from derex.runner.ddc import run_ddc_services
 from derex.runner.docker_utils import client as docker_client
 from derex.runner.docker_utils import wait_for_service
 from derex.runner.secrets import DerexSecrets
 from derex.runner.secrets import get_secret
+from derex.runner.utils import run_concurrently
+from functools import lru_cache
 from functools import wraps
+from pymongo import IndexModel
 from pymongo import MongoClient
-from typing import cast
+from pymongo.collection import Collection
+from pymongo.errors import PyMongoError
+from typing import Dict
+from typing import Iterator
 from typing import List
 from typing import Optional
 
 import logging
+import os
+import time
 import urllib.parse
 
 
 logger = logging.getLogger(__name__)
 MONGODB_ROOT_PASSWORD = get_secret(DerexSecrets.mongodb)
 
-try:
-    wait_for_service("mongodb")
-    container = docker_client.containers.get("mongodb")
+# Seconds to wait for the MongoDB server to accept a connection
+MONGODB_CONNECT_TIMEOUT = float(os.environ.get("DEREX_MONGODB_CONNECT_TIMEOUT", 5))
+
+# Number of collections copied concurrently by `copy_database`
+MONGODB_COPY_WORKERS = 4
+
+# Documents are inserted in batches of about this size (in bytes)
+MONGODB_COPY_BATCH_BYTES = 8 * 1024 * 1024
+
+# Number of documents fetched from the server in each cursor round trip
+MONGODB_CURSOR_BATCH_SIZE = 1000
+
+
+@lru_cache(maxsize=None)
+def get_mongodb_client(service: str = "mongodb") -> MongoClient:
+    """Return a client connected to the given derex MongoDB service.
+    The client is created on first use and then reused, together with its
+    connection pool. Raises RuntimeError if the service is not available.
+    """
+    wait_for_service(service)
+    container = docker_client.containers.get(service)
     mongo_address = container.attrs["NetworkSettings"]["Networks"]["derex"]["IPAddress"]
     user = urllib.parse.quote_plus(MONGODB_ROOT_USER)
     password = urllib.parse.quote_plus(MONGODB_ROOT_PASSWORD)
-    MONGODB_CLIENT = MongoClient(
-        f"mongodb://{user}:{password}@{mongo_address}:27017/", authSource="admin"
+    timeout_ms = int(MONGODB_CONNECT_TIMEOUT * 1000)
+    client = MongoClient(
+        f"mongodb://{user}:{password}@{mongo_address}:27017/",
+        authSource="admin",
+        connectTimeoutMS=timeout_ms,
+        serverSelectionTimeoutMS=timeout_ms,
     )
-except RuntimeError as e:
-    MONGODB_CLIENT = None
-    logger.warning(e)
+    if not check_mongodb_health(client):
+        client.close()
+        raise RuntimeError(
+            f"MongoDB service at {mongo_address} is not responding.\n"
+            "Maybe you forgot to run\n"
+            "ddc-services up -d"
+        )
+    return client
+
+
+def check_mongodb_health(client: MongoClient) -> bool:
+    """Return True if the MongoDB server answers a ping through the given client."""
+    try:
+        client.admin.command("ping")
+    except PyMongoError as exc:
+        logger.debug(f"MongoDB ping failed: {exc}")
+        return False
+    return True
+
+
+def __getattr__(name: str):
+    # Backwards compatibility: `MONGODB_CLIENT` used to be created on import
+    if name == "MONGODB_CLIENT":
+        try:
+            return get_mongodb_client()
+        except RuntimeError as e:
+            logger.warning(e)
+            return None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def ensure_mongodb(func):
@@ -38,16 +96,28 @@ def ensure_mongodb(func):
 
     @wraps(func)
     def inner(*args, **kwargs):
-        if MONGODB_CLIENT is None:
-            raise RuntimeError(
-                "MongoDB service not found.\nMaybe you forgot to run\nddc-services up -d"
-            )
+        get_mongodb_client()
         return func(*args, **kwargs)
 
     return inner
 
 
-@ensure_mongodb
+def ensure_mongodb_service(func):
+    """Decorator to wait for the mongodb service before running a function
+    that connects to it from inside its container. Unlike `ensure_mongodb`
+    it does not authenticate, since the credentials may be what the
+    function is about to fix.
+    """
+
+    @wraps(func)
+    def inner(*args, **kwargs):
+        wait_for_service("mongodb")
+        return func(*args, **kwargs)
+
+    return inner
+
+
+@ensure_mongodb_service
 def execute_root_shell(command: Optional[str]):
     """Open a root shell on the MongoDB database. If a command is given
     it is executed."""
@@ -71,42 +141,163 @@ def execute_root_shell(command: Optional[str]):
 def list_databases() -> List[dict]:
     """List all existing databases"""
     logger.info("Listing MongoDB databases...")
-    databases = [
-        database for database in cast(MongoClient, MONGODB_CLIENT).list_databases()
-    ]
-    return databases
+    return list(get_mongodb_client().list_databases())
 
 
 @ensure_mongodb
 def list_users() -> List[dict]:
     """List all existing users"""
     logger.info("Listing MongoDB users...")
-    return cast(MongoClient, MONGODB_CLIENT).admin.command("usersInfo").get("users")
+    return get_mongodb_client().admin.command("usersInfo").get("users")
 
 
 @ensure_mongodb
 def create_user(user: str, password: str, roles: List[str]):
     """Create a new user"""
     logger.info(f'Creating user "{user}"...')
-    cast(MongoClient, MONGODB_CLIENT).admin.command(
-        "createUser", user, pwd=password, roles=roles
-    )
+    get_mongodb_client().admin.command("createUser", user, pwd=password, roles=roles)
 
 
 @ensure_mongodb
 def drop_database(database_name: str):
     """Drop the selected database"""
     logger.info(f'Dropping database "{database_name}"...')
-    cast(MongoClient, MONGODB_CLIENT).drop_database(database_name)
+    get_mongodb_client().drop_database(database_name)
 
 
-@ensure_mongodb
-def copy_database(source_db_name: str, destination_db_name: str):
-    """Copy an existing database"""
-    logger.info(f'Copying database "{source_db_name}" to "{destination_db_name}...')
-    cast(MongoClient, MONGODB_CLIENT).admin.command(
-        "copydb", fromdb=source_db_name, todb=destination_db_name
+def iter_raw_batches(
+    collection: Collection, batch_bytes: int = MONGODB_COPY_BATCH_BYTES
+) -> Iterator[List[RawBSONDocument]]:
+    """Read all documents in the given collection with a cursor, and yield
+    them in lists holding about `batch_bytes` bytes of documents.
+    Documents are not decoded, and only one list is kept in memory.
+    """
+    raw_collection = collection.with_options(
+        codec_options=CodecOptions(document_class=RawBSONDocument)
     )
+    batch: List[RawBSONDocument] = []
+    size = 0
+    for document in raw_collection.find({}, batch_size=MONGODB_CURSOR_BATCH_SIZE):
+        batch.append(document)
+        size += len(document.raw)
+        if size >= batch_bytes:
+            yield batch
+            batch = []
+            size = 0
+    if batch:
+        yield batch
+
+
+def copy_collection(
+    source: Collection,
+    destination: Collection,
+    batch_bytes: int = MONGODB_COPY_BATCH_BYTES,
+) -> Dict[str, int]:
+    """Copy all documents of the source collection into the destination one,
+    with unordered bulk inserts of about `batch_bytes` bytes.
+    Return a dictionary with the number of copied `documents` and their
+    size in `bytes`.
+    """
+    documents = size = 0
+    for batch in iter_raw_batches(source, batch_bytes):
+        destination.insert_many(batch, ordered=False, bypass_document_validation=True)
+        documents += len(batch)
+        size += sum(len(document.raw) for document in batch)
+    return {"documents": documents, "bytes": size}
+
+
+def copy_indexes(source: Collection, destination: Collection):
+    """Create the indexes of the source collection on the destination one."""
+    indexes = []
+    for index in source.list_indexes():
+        if index["name"] == "_id_":
+            continue
+        options = {
+            key: value for key, value in index.items() if key not in ("key", "v", "ns")
+        }
+        indexes.append(IndexModel(list(index["key"].items()), **options))
+    if indexes:
+        destination.create_indexes(indexes)
+
+
+def copy_database(
+    source_db_name: str,
+    destination_db_name: str,
+    max_workers: int = MONGODB_COPY_WORKERS,
+    client: Optional[MongoClient] = None,
+) -> Dict[str, Dict]:
+    """Copy an existing database, collection by collection.
+
+    Collections are copied concurrently by `max_workers` threads, streaming
+    documents from a cursor and writing them with unordered bulk inserts,
+    so large collections (like the GridFS chunks of the contentstore)
+    are never loaded in memory as a whole. Indexes are created once all
+    documents are copied. Views are not copied.
+    The databases are accessed through the given client, which defaults to
+    the one of the "mongodb" service.
+
+    Return a dictionary mapping collection names to dictionaries with the
+    `documents`, `bytes` and `seconds` keys.
+    """
+    if client is None:
+        client = get_mongodb_client()
+    source_db = client[source_db_name]
+    destination_db = client[destination_db_name]
+    existing = destination_db.list_collection_names()
+    if existing:
+        raise RuntimeError(
+            f'Database "{destination_db_name}" already has collections: '
+            f"{', '.join(sorted(existing))}"
+        )
+    logger.info(f'Copying database "{source_db_name}" to "{destination_db_name}"...')
+    start = time.perf_counter()
+
+    collections = {}
+    views = []
+    for info in source_db.list_collections():
+        if info["name"].startswith("system."):
+            continue
+        if info.get("type", "collection") != "collection":
+            views.append(info["name"])
+            continue
+        collections[info["name"]] = info.get("options", {})
+    if views:
+        logger.warning(f"Not copying views {', '.join(sorted(views))}")
+    sizes = {
+        name: source_db.command("collStats", name).get("size", 0)
+        for name in collections
+    }
+
+    stats: Dict[str, Dict] = {}
+
+    def copy(name: str):
+        collection_start = time.perf_counter()
+        destination = destination_db.create_collection(name, **collections[name])
+        collection_stats = copy_collection(source_db[name], destination)
+        seconds = time.perf_counter() - collection_start
+        stats[name] = dict(collection_stats, seconds=seconds)
+        logger.info(
+            f"Copied collection {name}: {collection_stats['documents']} documents "
+            f"in {seconds:.2f}s "
+            f"({collection_stats['bytes'] / max(seconds, 1e-6) / 1e6:.1f} MB/s)"
+        )
+
+    # The biggest collections are started first, to shorten the total time
+    run_concurrently(
+        copy,
+        sorted(collections, key=lambda name: sizes[name], reverse=True),
+        max_workers,
+    )
+    run_concurrently(
+        lambda name: copy_indexes(source_db[name], destination_db[name]),
+        collections,
+        max_workers,
+    )
+    logger.info(
+        f'Successfully copied database "{source_db_name}" to "{destination_db_name}" '
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    return stats
 
 
 @ensure_mongodb
@@ -115,7 +306,7 @@ def create_root_user():
     create_user(MONGODB_ROOT_USER, MONGODB_ROOT_PASSWORD, ["root"])
 
 
-@ensure_mongodb
+@ensure_mongodb_service
 def reset_mongodb_password(current_password: str = None):
     """Reset the mongodb root user password"""
     mongo_command_args = [
@@ -1,25 +1,56 @@
+from contextlib import contextmanager
 from derex.runner.constants import MYSQL_ROOT_USER
 from derex.runner.ddc import run_ddc_project
 from derex.runner.ddc import run_ddc_services
 from derex.runner.docker_utils import client as docker_client
+from derex.runner.docker_utils import image_index
 from derex.runner.docker_utils import wait_for_service
 from derex.runner.project import Project
 from derex.runner.secrets import DerexSecrets
 from derex.runner.secrets import get_secret
 from derex.runner.utils import abspath_from_egg
+from derex.runner.utils import run_concurrently
+from functools import lru_cache
 from functools import wraps
+from threading import Lock
 from typing import cast
+from typing import Dict
+from typing import Iterator
 from typing import List
 from typing import Optional
 from typing import Tuple
 
+import atexit
+import hashlib
 import logging
 import pymysql
+import re
+import time
 
 
 logger = logging.getLogger(__name__)
 MYSQL_ROOT_PASSWORD = get_secret(DerexSecrets.mysql)
 
+# Maximum number of idle connections kept by each connection pool
+MYSQL_POOL_SIZE = 4
+
+# Number of tables copied concurrently by `copy_database`
+MYSQL_COPY_WORKERS = 4
+
+# Maximum number of rows copied by each `INSERT ... SELECT` of `copy_database`
+MYSQL_COPY_CHUNK_ROWS = 50000
+
+# Prefix of the databases holding snapshots of freshly reset project databases
+MYSQL_SNAPSHOT_PREFIX = "derex_snapshot_"
+
+
+@lru_cache(maxsize=None)
+def wait_for_mysql(service: str = "mysql"):
+    """Wait for the given mysql service to be ready. Once it is, it is assumed
+    to stay ready for the lifetime of the process.
+    """
+    wait_for_service(service)
+
 
 def ensure_mysql(func):
     """Decorator to raise an exception before running a function in case the MySQL
@@ -28,18 +59,170 @@ def ensure_mysql(func):
 
     @wraps(func)
     def inner(*args, **kwargs):
-        wait_for_service("mysql")
+        wait_for_mysql()
         return func(*args, **kwargs)
 
     return inner
 
 
-@ensure_mysql
+@lru_cache(maxsize=None)
+def get_system_mysql_host(service: str = "mysql") -> str:
+    """Return the IP address of the given mysql service container.
+    The docker API is only queried the first time.
+    """
+    wait_for_mysql(service)
+    container = docker_client.containers.get(service)
+    return container.attrs["NetworkSettings"]["Networks"]["derex"]["IPAddress"]
+
+
+class MySQLConnectionPool:
+    """A thread safe pool of pymysql connections sharing the same
+    connection parameters. Connections are opened on demand and up to
+    `size` idle connections are kept open to be reused.
+    Since connections are shared, users should not change their session
+    state (e.g. with `USE database`).
+
+    .. code-block:: python
+
+        pool = MySQLConnectionPool(host="172.18.0.2", user="root", password="secret")
+        with pool.cursor() as cursor:
+            cursor.execute("SHOW DATABASES;")
+    """
+
+    def __init__(self, size: int = MYSQL_POOL_SIZE, **connect_kwargs):
+        self.size = size
+        self.connect_kwargs = connect_kwargs
+        self._idle: List[pymysql.connections.Connection] = []
+        self._lock = Lock()
+
+    def acquire(self) -> pymysql.connections.Connection:
+        """Return an open connection, reusing an idle one if possible."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                connection = self._idle.pop()
+            try:
+                connection.ping(reconnect=False)
+            except pymysql.err.Error:
+                logger.debug("Discarding stale mysql connection")
+                continue
+            return connection
+        return pymysql.connect(**self.connect_kwargs)
+
+    def release(self, connection: pymysql.connections.Connection):
+        """Give back a connection to the pool. Connections exceeding
+        the pool size are closed.
+        """
+        if not connection.open:
+            return
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[pymysql.connections.Connection]:
+        """Context manager yielding a connection from the pool.
+        A connection that raised an error is closed instead of being reused.
+        """
+        connection = self.acquire()
+        try:
+            yield connection
+        except BaseException:
+            connection.close()
+            raise
+        self.release(connection)
+
+    @contextmanager
+    def cursor(self) -> Iterator[pymysql.cursors.Cursor]:
+        """Context manager yielding a cursor on a connection from the pool."""
+        with self.connection() as connection:
+            with connection.cursor() as cursor:
+                yield cursor
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            try:
+                connection.close()
+            except pymysql.err.Error:
+                pass
+
+
+_connection_pools: Dict[Tuple, MySQLConnectionPool] = {}
+_connection_pools_lock = Lock()
+
+
+def get_connection_pool(
+    host: str,
+    user: str,
+    password: str,
+    port: int = 3306,
+    database: Optional[str] = None,
+) -> MySQLConnectionPool:
+    """Return the connection pool for the given connection parameters,
+    creating it if needed. Pooled connections use autocommit.
+    """
+    key = (host, port, user, password, database)
+    with _connection_pools_lock:
+        pool = _connection_pools.get(key)
+        if pool is None:
+            pool = _connection_pools[key] = MySQLConnectionPool(
+                host=host,
+                port=port,
+                user=user,
+                passwd=password,
+                db=database,
+                autocommit=True,
+            )
+    return pool
+
+
+def get_system_connection_pool(service: str = "mysql") -> MySQLConnectionPool:
+    """Return the connection pool for the mysql root user
+    on the given mysql service.
+    """
+    return get_connection_pool(
+        host=get_system_mysql_host(service),
+        user=MYSQL_ROOT_USER,
+        password=MYSQL_ROOT_PASSWORD,
+    )
+
+
+@contextmanager
+def system_mysql_cursor(service: str = "mysql") -> Iterator[pymysql.cursors.Cursor]:
+    """Context manager yielding a cursor for the mysql root user,
+    on a pooled connection to the given mysql service.
+
+    .. code-block:: python
+
+        with system_mysql_cursor() as cursor:
+            cursor.execute("SHOW DATABASES;")
+    """
+    with get_system_connection_pool(service).cursor() as cursor:
+        yield cursor
+
+
+@atexit.register
+def close_connection_pools():
+    """Close all pooled connections and forget the cached mysql host."""
+    with _connection_pools_lock:
+        pools = list(_connection_pools.values())
+        _connection_pools.clear()
+    for pool in pools:
+        pool.close()
+    get_system_mysql_host.cache_clear()
+
+
 def get_system_mysql_client() -> pymysql.cursors.Cursor:
-    container = docker_client.containers.get("mysql")
-    mysql_host = container.attrs["NetworkSettings"]["Networks"]["derex"]["IPAddress"]
     return get_mysql_client(
-        host=mysql_host, user=MYSQL_ROOT_USER, password=MYSQL_ROOT_PASSWORD
+        host=get_system_mysql_host(),
+        user=MYSQL_ROOT_USER,
+        password=MYSQL_ROOT_PASSWORD,
     )
 
 
@@ -62,8 +245,9 @@ def get_mysql_client(
     database: Optional[str] = None,
     **kwargs,
 ) -> pymysql.cursors.Cursor:
-    """Return a cursor on the mysql server. If the connection object is needed
-    it can be accessed from the cursor object:
+    """Return a cursor on a new connection to the mysql server.
+    The connection is not pooled, and the caller should close it.
+    If the connection object is needed it can be accessed from the cursor object:
 
     .. code-block:: python
 
@@ -76,72 +260,119 @@ def get_mysql_client(
     return connection.cursor()
 
 
-def show_databases() -> List[Tuple[str, int, int]]:
+def show_databases(sizes: bool = False) -> List[Tuple]:
     """List all existing databases together with some
     useful infos (number of tables, number of Django users).
+    If `sizes` is True the data and index sizes in bytes are also included.
+
+    At most two queries are issued, regardless of the number of databases:
+    one to collect table counts and sizes from `information_schema`, and
+    one to count Django users in the databases that have an `auth_user` table.
     """
-    client = get_system_mysql_client()
-    try:
-        databases_tuples = []
-        client.execute("SHOW DATABASES;")
-        query_result = cast(Tuple[Tuple[str]], client.fetchall())
-        databases_names = [row[0] for row in query_result]
-        for database_name in databases_names:
-            client.execute(f"USE `{database_name}`")
-            table_count = client.execute("SHOW TABLES;")
-            try:
-                client.execute("SELECT COUNT(*) FROM auth_user;")
-                query_result = cast(Tuple[Tuple[str]], client.fetchall())
-                django_users_count = int(query_result[0][0])
-            except (
-                pymysql.err.InternalError,
-                pymysql.err.ProgrammingError,
-                pymysql.err.OperationalError,
-            ):
-                django_users_count = 0
-            databases_tuples.append((database_name, table_count, django_users_count))
-    finally:
-        client.connection.close()
+    with system_mysql_cursor() as client:
+        client.execute(
+            "SELECT s.SCHEMA_NAME, COUNT(t.TABLE_NAME),"
+            " SUM(t.TABLE_NAME = 'auth_user'),"
+            " COALESCE(SUM(t.DATA_LENGTH), 0), COALESCE(SUM(t.INDEX_LENGTH), 0)"
+            " FROM information_schema.SCHEMATA s"
+            " LEFT JOIN information_schema.TABLES t"
+            " ON t.TABLE_SCHEMA = s.SCHEMA_NAME"
+            " GROUP BY s.SCHEMA_NAME ORDER BY s.SCHEMA_NAME;"
+        )
+        schemas = cast(Tuple[Tuple[str, int, int, int, int]], client.fetchall())
+        django_users_counts = get_django_users_counts(
+            client, [row[0] for row in schemas if row[2]]
+        )
+
+    databases_tuples: List[Tuple] = []
+    for database_name, table_count, _, data_length, index_length in schemas:
+        database_tuple: Tuple = (
+            database_name,
+            int(table_count),
+            django_users_counts.get(database_name, 0),
+        )
+        if sizes:
+            database_tuple += (int(data_length), int(index_length))
+        databases_tuples.append(database_tuple)
     return databases_tuples
 
 
+def get_django_users_counts(
+    client: pymysql.cursors.Cursor, databases_names: List[str]
+) -> Dict[str, int]:
+    """Return a dictionary mapping the given database names to the number
+    of rows in their `auth_user` table, counted with a single query.
+    If the query fails every database is probed on its own, and databases
+    whose `auth_user` table can't be read are left out.
+    """
+    if not databases_names:
+        return {}
+    # Names are formatted with the query parameters: `%` must be escaped
+    query = " UNION ALL ".join(
+        f"SELECT %s, COUNT(*) FROM {quote_identifier(name).replace('%', '%%')}"
+        ".auth_user"
+        for name in databases_names
+    )
+    try:
+        client.execute(query, databases_names)
+    except pymysql.err.MySQLError as exc:
+        logger.debug(f"Could not count Django users in a single query: {exc}")
+    else:
+        return {name: int(count) for name, count in client.fetchall()}
+
+    counts = {}
+    for name in databases_names:
+        try:
+            client.execute(f"SELECT COUNT(*) FROM {quote_identifier(name)}.auth_user;")
+        except pymysql.err.MySQLError:
+            continue
+        counts[name] = int(client.fetchone()[0])
+    return counts
+
+
+def quote_identifier(name: str) -> str:
+    """Quote a MySQL identifier (e.g. a database name) with backticks."""
+    escaped = name.replace("`", "``")
+    return f"`{escaped}`"
+
+
 def list_users() -> Optional[Tuple[Tuple[str, str, str]]]:
     """List all mysql users."""
-    client = get_system_mysql_client()
-    client.execute("SELECT user, host, password FROM mysql.user;")
-    users = cast(Tuple[Tuple[str, str, str]], client.fetchall())
+    with system_mysql_cursor() as client:
+        client.execute("SELECT user, host, password FROM mysql.user;")
+        users = cast(Tuple[Tuple[str, str, str]], client.fetchall())
     return users
 
 
-def create_database(database_name: str):
+def create_database(database_name: str, service: str = "mysql"):
     """Create a database if doesn't exists."""
-    client = get_system_mysql_client()
     logger.info(f'Creating database "{database_name}"...')
-    client.execute(f"CREATE DATABASE `{database_name}` CHARACTER SET utf8")
+    with system_mysql_cursor(service) as client:
+        client.execute(f"CREATE DATABASE `{database_name}` CHARACTER SET utf8")
     logger.info(f'Successfully created database "{database_name}"')
 
 
 def create_user(user: str, password: str, host: str):
     """Create a user if doesn't exists."""
-    client = get_system_mysql_client()
     logger.info(f"Creating user '{user}'@'{host}'...")
-    client.execute(f"CREATE USER '{user}'@'{host}' IDENTIFIED BY '{password}';")
+    with system_mysql_cursor() as client:
+        client.execute(f"CREATE USER '{user}'@'{host}' IDENTIFIED BY '{password}';")
     logger.info(f"Successfully created user '{user}'@'{host}'")
 
 
-def drop_database(database_name: str):
+def drop_database(database_name: str, service: str = "mysql"):
     """Drops the selected database."""
-    client = get_system_mysql_client()
     logger.info(f'Dropping database "{database_name}"...')
-    client.execute(f"DROP DATABASE IF EXISTS `{database_name}`;")
+    with system_mysql_cursor(service) as client:
+        client.execute(f"DROP DATABASE IF EXISTS `{database_name}`;")
     logger.info(f'Successfully dropped database "{database_name}"')
 
 
 def drop_user(user: str, host: str):
     """Drops the selected user."""
-    client = get_system_mysql_client()
     logger.info(f"Dropping user '{user}'@'{host}'...")
-    client.execute(f"DROP USER '{user}'@'{host}';")
+    with system_mysql_cursor() as client:
+        client.execute(f"DROP USER '{user}'@'{host}';")
     logger.info(f"Successfully dropped user '{user}'@'{host}'")
 
 
@@ -163,33 +394,351 @@ def execute_root_shell(command: Optional[str]):
     run_ddc_services(compose_args, exit_afterwards=True)
 
 
-@ensure_mysql
-def copy_database(source_db_name: str, destination_db_name: str):
-    """Copy an existing MySQL database. This actually involves exporting and importing back
-    the database with a different name."""
-    create_database(destination_db_name)
+# Prefixes of the `SHOW CREATE TABLE` lines defining secondary indexes
+INDEX_DEFINITIONS = ("KEY ", "UNIQUE KEY ", "FULLTEXT KEY ", "SPATIAL KEY ")
+
+IDENTIFIER_RE = re.compile(r"`((?:[^`]|``)+)`")
+
+
+def get_index_columns(clause: str) -> List[str]:
+    """Return the names of the columns in a `SHOW CREATE TABLE` index
+    definition, like "KEY `name` (`first`,`second`(10))".
+    """
+    _, _, columns = clause.partition("(")
+    return [name.replace("``", "`") for name in IDENTIFIER_RE.findall(columns)]
+
+
+def split_table_definition(definition: str) -> Tuple[str, List[str], List[str]]:
+    """Split a `SHOW CREATE TABLE` statement in a 3-tuple:
+
+    * a statement creating the table with its columns and primary key only
+    * the definitions of its secondary indexes
+    * the definitions of its constraints (e.g. foreign keys)
+
+    so that indexes and constraints can be added after the table is filled.
+    MySQL needs an AUTO_INCREMENT column to be the first column of an index:
+    if the primary key does not start with it, the first secondary index
+    that does is kept in the create statement.
+    """
+    lines = definition.splitlines()
+    end = max(i for i, line in enumerate(lines) if line.startswith(")"))
+    columns: List[str] = []
+    indexes: List[str] = []
+    constraints: List[str] = []
+    auto_increment_column = None
+    primary_key: List[str] = []
+    for line in lines[1:end]:
+        clause = line.strip().rstrip(",")
+        if clause.startswith("CONSTRAINT "):
+            constraints.append(clause)
+        elif clause.startswith(INDEX_DEFINITIONS):
+            indexes.append(clause)
+        else:
+            if clause.startswith("PRIMARY KEY "):
+                primary_key = get_index_columns(clause)
+            elif clause.startswith("`") and " AUTO_INCREMENT" in clause:
+                auto_increment_column = IDENTIFIER_RE.findall(clause)[0].replace(
+                    "``", "`"
+                )
+            columns.append(f"  {clause}")
+    if auto_increment_column is not None and primary_key[:1] != [auto_increment_column]:
+        for index in indexes:
+            if get_index_columns(index)[:1] == [auto_increment_column]:
+                indexes.remove(index)
+                columns.append(f"  {index}")
+                break
+    create_statement = "\n".join([lines[0], ",\n".join(columns), *lines[end:]])
+    return create_statement, indexes, constraints
+
+
+def copy_table(
+    pool: MySQLConnectionPool,
+    source_db_name: str,
+    table: str,
+    create_statement: str,
+    chunk_rows: int = MYSQL_COPY_CHUNK_ROWS,
+) -> int:
+    """Create a table in the database of the connections of the given pool,
+    and fill it with the rows of the table with the same name in the
+    source database. Return the number of copied rows.
+
+    Tables with a single column primary key are copied in chunks of
+    `chunk_rows` rows, so that every `INSERT ... SELECT` statement runs in
+    a transaction of bounded size. Other tables are copied at once.
+    """
+    primary_key = []
+    for line in create_statement.splitlines():
+        if line.strip().startswith("PRIMARY KEY "):
+            primary_key = get_index_columns(line)
+    # Identifiers are formatted with the query parameters: `%` must be escaped
+    source = f"{quote_identifier(source_db_name)}.{quote_identifier(table)}".replace(
+        "%", "%%"
+    )
+    insert = f"INSERT INTO {quote_identifier(table)}".replace("%", "%%")
+    with pool.cursor() as cursor:
+        cursor.execute(create_statement)
+        if len(primary_key) != 1:
+            cursor.execute(f"{insert} SELECT * FROM {source}", ())
+            return cursor.rowcount
+
+        key = quote_identifier(primary_key[0]).replace("%", "%%")
+        rows = 0
+        last = None
+        while True:
+            after = "" if last is None else f" WHERE {key} > %s"
+            after_params: Tuple = () if last is None else (last,)
+            # Find the last key of the chunk
+            cursor.execute(
+                f"SELECT {key} FROM {source}{after} "
+                f"ORDER BY {key} LIMIT 1 OFFSET {chunk_rows - 1}",
+                after_params,
+            )
+            bound = cursor.fetchone()
+            if bound is None:
+                cursor.execute(f"{insert} SELECT * FROM {source}{after}", after_params)
+                return rows + cursor.rowcount
+            upto = f"{' AND' if after else ' WHERE'} {key} <= %s"
+            cursor.execute(
+                f"{insert} SELECT * FROM {source}{after}{upto}",
+                after_params + (bound[0],),
+            )
+            rows += cursor.rowcount
+            last = bound[0]
+
+
+def add_table_definitions(
+    pool: MySQLConnectionPool, table: str, definitions: List[str]
+):
+    """Add the given index or constraint definitions to a table in the
+    database of the connections of the given pool.
+    """
+    if not definitions:
+        return
+    with pool.cursor() as cursor:
+        cursor.execute(
+            f"ALTER TABLE {quote_identifier(table)} "
+            + ", ".join(f"ADD {definition}" for definition in definitions)
+        )
+
+
+def database_exists(database_name: str, service: str = "mysql") -> bool:
+    """Return True if the given database exists on the given mysql service."""
+    with system_mysql_cursor(service) as cursor:
+        cursor.execute(
+            "SELECT SCHEMA_NAME FROM information_schema.SCHEMATA "
+            "WHERE SCHEMA_NAME = %s",
+            (database_name,),
+        )
+        return cursor.fetchone() is not None
+
+
+def copy_database(
+    source_db_name: str,
+    destination_db_name: str,
+    max_workers: int = MYSQL_COPY_WORKERS,
+    chunk_rows: int = MYSQL_COPY_CHUNK_ROWS,
+    service: str = "mysql",
+) -> Dict[str, Dict]:
+    """Copy an existing MySQL database of the given mysql service,
+    table by table.
+
+    Tables are copied concurrently by `max_workers` connections, each running
+    `INSERT ... SELECT` statements of up to `chunk_rows` rows on the server
+    (see `copy_table`). The source tables are read locked during the copy,
+    so that all tables are copied from the same state.
+    Secondary indexes and constraints are only added once all rows are copied.
+    Views, triggers and routines are not copied.
+
+    Return a dictionary mapping table names to dictionaries with the
+    `rows`, `bytes` and `seconds` keys.
+    Raises RuntimeError if the source database does not exist.
+    """
+    if not database_exists(source_db_name, service):
+        raise RuntimeError(f'Database "{source_db_name}" does not exist')
+    create_database(destination_db_name, service)
     logger.info(f"Copying database {source_db_name} to {destination_db_name}")
-    run_ddc_services(
-        [
-            "exec",
-            "-T",
-            "mysql",
-            "sh",
-            "-c",
-            f"""set -ex
-                mysqldump -u root -p{MYSQL_ROOT_PASSWORD} {source_db_name} --no-create-db |
-                mysql --user=root -p{MYSQL_ROOT_PASSWORD} {destination_db_name}
-            """,
-        ]
+    start = time.perf_counter()
+    pool = MySQLConnectionPool(
+        size=max_workers,
+        host=get_system_mysql_host(service),
+        user=MYSQL_ROOT_USER,
+        passwd=MYSQL_ROOT_PASSWORD,
+        db=destination_db_name,
+        autocommit=True,
+        init_command="SET SESSION foreign_key_checks = 0, SESSION unique_checks = 0",
     )
+    try:
+        with pool.cursor() as cursor:
+            cursor.execute(
+                "SELECT TABLE_NAME, TABLE_TYPE, "
+                "COALESCE(DATA_LENGTH, 0) + COALESCE(INDEX_LENGTH, 0) "
+                "FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s",
+                (source_db_name,),
+            )
+            rows = cursor.fetchall()
+            tables = {name: size for name, kind, size in rows if kind == "BASE TABLE"}
+            skipped = sorted(name for name, kind, _ in rows if kind != "BASE TABLE")
+            definitions = {}
+            for table in tables:
+                cursor.execute(
+                    f"SHOW CREATE TABLE {quote_identifier(source_db_name)}."
+                    f"{quote_identifier(table)}"
+                )
+                definitions[table] = split_table_definition(cursor.fetchone()[1])
+        if skipped:
+            logger.warning(f"Not copying views {', '.join(skipped)}")
+
+        stats: Dict[str, Dict] = {}
+
+        def copy(table: str):
+            table_start = time.perf_counter()
+            copied_rows = copy_table(
+                pool, source_db_name, table, definitions[table][0], chunk_rows
+            )
+            seconds = time.perf_counter() - table_start
+            stats[table] = {
+                "rows": copied_rows,
+                "bytes": tables[table],
+                "seconds": seconds,
+            }
+            logger.info(
+                f"Copied table {table}: {copied_rows} rows in {seconds:.2f}s "
+                f"({tables[table] / max(seconds, 1e-6) / 1e6:.1f} MB/s)"
+            )
+
+        with pool.connection() as lock_connection:
+            if tables:
+                with lock_connection.cursor() as cursor:
+                    cursor.execute(
+                        "FLUSH TABLES "
+                        + ", ".join(
+                            f"{quote_identifier(source_db_name)}.{quote_identifier(table)}"
+                            for table in tables
+                        )
+                        + " WITH READ LOCK"
+                    )
+            try:
+                run_concurrently(
+                    copy,
+                    sorted(tables, key=lambda table: tables[table], reverse=True),
+                    max_workers,
+                )
+            finally:
+                with lock_connection.cursor() as cursor:
+                    cursor.execute("UNLOCK TABLES")
+
+        # Constraints may need the indexes of other tables to be in place
+        run_concurrently(
+            lambda table: add_table_definitions(pool, table, definitions[table][1]),
+            tables,
+            max_workers,
+        )
+        run_concurrently(
+            lambda table: add_table_definitions(pool, table, definitions[table][2]),
+            tables,
+            max_workers,
+        )
+    finally:
+        pool.close()
     logger.info(
-        f"Successfully copied database {source_db_name} to {destination_db_name}"
+        f"Successfully copied database {source_db_name} to {destination_db_name} "
+        f"in {time.perf_counter() - start:.2f}s"
     )
+    return stats
 
 
-@ensure_mysql
-def reset_mysql_openedx(project: Project, dry_run: bool = False):
-    """Run script from derex/openedx image to reset the mysql db."""
+def get_reset_snapshot_prefix(project: Project) -> str:
+    """Return the prefix of the names of the databases holding snapshots
+    of the database of the given project right after a reset.
+    """
+    project_hash = hashlib.sha256(project.name.encode()).hexdigest()[:8]
+    return f"{MYSQL_SNAPSHOT_PREFIX}{project_hash}_"
+
+
+def get_reset_snapshot_name(project: Project) -> Optional[str]:
+    """Return the name of the database holding a snapshot of the database
+    of the given project right after a reset, or None if the project docker
+    image is not available locally.
+
+    The name depends on the docker image, which holds the dump that
+    is restored, so that changing it invalidates the snapshot.
+    Fixtures are not taken into account: the snapshot records which
+    fixtures were loaded, and only new or changed ones are loaded
+    after restoring it.
+    """
+    image = image_index.get(project.docker_image_name)
+    if image is None:
+        return None
+    digest = hashlib.sha256(image["Id"].encode()).hexdigest()[:16]
+    return f"{get_reset_snapshot_prefix(project)}{digest}"
+
+
+def list_databases_with_prefix(prefix: str, service: str = "mysql") -> List[str]:
+    """Return the names of the databases of the given mysql service
+    starting with the given prefix.
+    """
+    escaped = prefix.replace("\\", "\\\\").replace("_", "\\_").replace("%", "\\%")
+    with system_mysql_cursor(service) as client:
+        client.execute(
+            "SELECT SCHEMA_NAME FROM information_schema.SCHEMATA "
+            "WHERE SCHEMA_NAME LIKE %s",
+            (f"{escaped}%",),
+        )
+        return [row[0] for row in client.fetchall()]
+
+
+def reset_mysql_openedx(
+    project: Project, dry_run: bool = False, use_snapshot: bool = True
+):
+    """Run script from derex/openedx image to reset the mysql db.
+
+    After a successful reset a snapshot of the database is kept in another
+    database of the same mysql service (see `get_reset_snapshot_name`):
+    when `use_snapshot` is True and a snapshot is available, the database
+    is copied from it instead, and only fixtures changed since the snapshot
+    was taken are loaded.
+    """
+    service = project.mysql_service
+    wait_for_mysql(service)
+    snapshot = None
+    if use_snapshot and not dry_run:
+        snapshot = get_reset_snapshot_name(project)
+    if snapshot is not None and snapshot in list_databases_with_prefix(
+        snapshot, service
+    ):
+        logger.info(f"Restoring database {project.mysql_db_name} from {snapshot}")
+        drop_database(project.mysql_db_name, service)
+        copy_database(snapshot, project.mysql_db_name, service=service)
+        if project.fixtures_dir is not None:
+            run_restore_dump(project, ["--fixtures-only"])
+        return
+
+    run_restore_dump(project, dry_run=dry_run)
+    if snapshot is None:
+        return
+
+    if not database_exists(project.mysql_db_name, service):
+        raise RuntimeError(
+            f'Database "{project.mysql_db_name}" not found on service "{service}" '
+            "after the reset: not saving a snapshot"
+        )
+    for stale_snapshot in list_databases_with_prefix(
+        get_reset_snapshot_prefix(project), service
+    ):
+        drop_database(stale_snapshot, service)
+    logger.info(f"Saving a snapshot of {project.mysql_db_name} to {snapshot}")
+    try:
+        copy_database(project.mysql_db_name, snapshot, service=service)
+    except BaseException:
+        # Never leave an incomplete snapshot behind
+        drop_database(snapshot, service)
+        raise
+
+
+def run_restore_dump(
+    project: Project, args: Optional[List[str]] = None, dry_run: bool = False
+):
+    """Run the restore_dump.py script in a container of the given project."""
     restore_dump_path = abspath_from_egg(
         "derex.runner", "derex/runner/restore_dump.py.source"
     )
@@ -205,7 +754,8 @@ def reset_mysql_openedx(project: Project, dry_run: bool = False):
             "lms",
             "python",
             "/restore_dump.py",
-        ],
+        ]
+        + (args or []),
         project=project,
         dry_run=dry_run,
     )
@@ -30,6 +30,23 @@ def ddc_services_options() -> Dict[str, Union[str, float, int, List[str]]]:
     """
 
 
+@hookspec
+def ddc_services_volumes() -> List[str]:
+    """Return a list of names of docker volumes needed by the services
+    this plugin adds. They will be created if they don't exist before
+    running docker-compose.
+
+    Called by ddc-services cli command.
+
+    Example:
+
+    .. code-block:: python
+
+        ["derex_addon_data"]
+    """
+    return []
+
+
 @hookspec
 def ddc_project_options(
     project: Project,
@@ -1,12 +1,21 @@
+from bisect import bisect_left
+from bisect import bisect_right
 from collections import namedtuple
+from contextlib import contextmanager
 from derex.runner import compose_generation
 from derex.runner import plugin_spec
+from functools import lru_cache
+from functools import wraps
 from pprint import pformat
+from typing import Callable
 from typing import Dict
 from typing import List
+from typing import Tuple
 
 import logging
 import pluggy
+import time
+import tracemalloc
 
 
 logger = logging.getLogger(__name__)
@@ -21,9 +30,146 @@ def setup_plugin_manager():
     plugin_manager.register(compose_generation.LocalServices)
     plugin_manager.register(compose_generation.LocalProject)
     plugin_manager.register(compose_generation.LocalProjectRunmode)
+    time_hook_implementations(plugin_manager)
     return plugin_manager
 
 
+@lru_cache(maxsize=None)
+def get_plugin_manager() -> pluggy.PluginManager:
+    """Return the plugin manager shared by the whole process.
+    Loading setuptools entrypoints means scanning all installed distributions,
+    so it's only done the first time this function is called.
+    """
+    start = time.perf_counter()
+    plugin_manager = setup_plugin_manager()
+    logger.debug(f"Plugin manager set up in {time.perf_counter() - start:.3f}s")
+    return plugin_manager
+
+
+def time_hook_implementations(plugin_manager: pluggy.PluginManager):
+    """Wrap the implementations of all hooks registered in the given plugin
+    manager so that the time each plugin takes to run each hook is logged
+    when debug logging is enabled, and recorded by `hook_profiler` when
+    it's enabled. Implementations that are already wrapped are skipped, so
+    this can be called again after registering more plugins.
+    """
+    for hook_name, hook_caller in vars(plugin_manager.hook).items():
+        for hook_impl in hook_caller.get_hookimpls():
+            if hook_impl.hookwrapper or getattr(hook_impl, "wrapper", False):
+                continue
+            if getattr(hook_impl.function, "_derex_timed", False):
+                continue
+            hook_impl.function = timed_hook_implementation(
+                hook_impl.function, hook_name, hook_impl.plugin_name
+            )
+
+
+def timed_hook_implementation(
+    function: Callable, hook_name: str, plugin_name: str
+) -> Callable:
+    """Return a wrapper of the given hook implementation that logs
+    its duration when debug logging is enabled, and profiles it
+    when `hook_profiler` is enabled.
+    """
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        if hook_profiler.enabled:
+            with hook_profiler.measure(hook_name, plugin_name):
+                return function(*args, **kwargs)
+        if not logger.isEnabledFor(logging.DEBUG):
+            return function(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            logger.debug(
+                f"Plugin {plugin_name} ran {hook_name} "
+                f"in {(time.perf_counter() - start) * 1000:.1f}ms"
+            )
+
+    wrapper._derex_timed = True  # type: ignore
+    return wrapper
+
+
+class HookProfiler:
+    """Records the wall time and the memory allocated by every plugin
+    implementation of derex hooks while it's enabled.
+
+    Memory is traced with `tracemalloc`, which slows down the profiled code:
+    durations are only meaningful when compared with each other.
+
+    .. code-block:: python
+
+        hook_profiler.start()
+        get_plugin_manager().hook.ddc_services_options()
+        hook_profiler.stop()
+        print(hook_profiler.get_records())
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._records: Dict[Tuple[str, str], Dict] = {}
+        self._started_tracemalloc = False
+
+    def start(self):
+        """Forget previous records and start profiling hook implementations."""
+        self._records = {}
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self.enabled = True
+
+    def stop(self):
+        """Stop profiling hook implementations."""
+        self.enabled = False
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    @contextmanager
+    def measure(self, hook_name: str, plugin_name: str):
+        """Record the duration and memory allocated by the wrapped block."""
+        reset_peak = getattr(tracemalloc, "reset_peak", None)  # Python >= 3.9
+        if reset_peak is not None:
+            reset_peak()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            memory = (peak if reset_peak is not None else current) - memory_before
+            record = self._records.setdefault(
+                (hook_name, plugin_name),
+                {
+                    "hook": hook_name,
+                    "plugin": plugin_name,
+                    "calls": 0,
+                    "seconds": 0.0,
+                    "memory": 0,
+                },
+            )
+            record["calls"] += 1
+            record["seconds"] += seconds
+            record["memory"] = max(record["memory"], memory)
+
+    def get_records(self) -> List[Dict]:
+        """Return a list of dictionaries with the `hook`, `plugin`, `calls`,
+        `seconds` and `memory` (peak bytes allocated by a single call) keys,
+        slowest first.
+        """
+        return sorted(
+            (dict(record) for record in self._records.values()),
+            key=lambda record: record["seconds"],
+            reverse=True,
+        )
+
+
+hook_profiler = HookProfiler()
+
+
 # Used internally by `Registry` for each item in its sorted list.
 # Provides an easier to read API when editing the code later.
 # For example, `item.name` is more clear than `item[0]`.
@@ -69,12 +215,17 @@ class Registry(object):
 
     The method `get_index_for_name` is also available to obtain the index of
     an item using that item's assigned "name".
+
+    Items are kept sorted as they are registered: `_keys` holds the negated
+    priorities of the items in `_priority`, so that positions can be found
+    with a binary search.
     """
 
     def __init__(self):
         self._data = {}
         self._priority = []
-        self._is_sorted = False
+        self._keys = []
+        self._priorities = {}
 
     def __contains__(self, item):
         if isinstance(item, str):
@@ -84,11 +235,9 @@ class Registry(object):
         return item in self._data.values()
 
     def __iter__(self):
-        self._sort()
         return iter([self._data[k] for k, p in self._priority])
 
     def __getitem__(self, key):
-        self._sort()
         if isinstance(key, slice):
             data = Registry()
             for k, p in self._priority[key]:
@@ -109,10 +258,12 @@ class Registry(object):
         Return the index of the given name.
         """
         if name in self:
-            self._sort()
-            return self._priority.index(
-                [x for x in self._priority if x.name == name][0]
-            )
+            key = -self._priorities[name]
+            index = bisect_left(self._keys, key)
+            # Items with the same priority are next to each other
+            while self._priority[index].name != name:
+                index += 1
+            return index
         raise ValueError('No item named "{0}" exists.'.format(name))
 
     def register(self, item, name, priority):
@@ -131,9 +282,12 @@ class Registry(object):
         if name in self:
             # Remove existing item of same name first
             self.deregister(name)
-        self._is_sorted = False
+        # Items with the same priority are kept in registration order
+        index = bisect_right(self._keys, -priority)
+        self._keys.insert(index, -priority)
+        self._priority.insert(index, _PriorityItem(name, priority))
+        self._priorities[name] = priority
         self._data[name] = item
-        self._priority.append(_PriorityItem(name, priority))
 
     def deregister(self, name, strict=True):
         """
@@ -143,31 +297,22 @@ class Registry(object):
         try:
             index = self.get_index_for_name(name)
             del self._priority[index]
+            del self._keys[index]
+            del self._priorities[name]
             del self._data[name]
         except ValueError:
             if strict:
                 raise
 
-    def _sort(self):
-        """
-        Sort the registry by priority from highest to lowest.
-        This method is called internally and should never be explicitly called.
-        """
-        if not self._is_sorted:
-            self._priority.sort(key=lambda item: item.priority, reverse=True)
-            self._is_sorted = True
-
     def add(self, key, value, location):
         """Register a key by location."""
         if len(self) == 0:
             # This is the first item. Set priority to 50.
             priority = 50
         elif location == "_begin":
-            self._sort()
             # Set priority 5 greater than highest existing priority
             priority = self._priority[0].priority + 5
         elif location == "_end":
-            self._sort()
             # Set priority 5 less than lowest existing priority
             priority = self._priority[-1].priority - 5
         elif location.startswith("<") or location.startswith(">"):
@@ -241,14 +386,26 @@ def sort_items(dictionaries: List[Dict], item_key: str) -> List[Dict]:
             "item_key": item
         }
     """
+    order = resolve_order(
+        tuple(
+            (dictionary["name"], dictionary["priority"]) for dictionary in dictionaries
+        )
+    )
+    return [item for index in order for item in dictionaries[index][item_key]]
+
+
+@lru_cache(maxsize=128)
+def resolve_order(locations: Tuple[Tuple[str, str], ...]) -> Tuple[int, ...]:
+    """Given a tuple of `(name, location)` pairs, return the indexes of the
+    pairs that end up in a `Registry` when they're added with `add_list`,
+    in the registry order.
+    Resolving the same names and locations again is served from a cache.
+    """
     registry = Registry()
     registry.add_list(
-        [
-            (dictionary["name"], dictionary[item_key], dictionary["priority"])
-            for dictionary in dictionaries
-        ]
+        [(name, index, location) for index, (name, location) in enumerate(locations)]
     )
-    return [item for lst in registry for item in lst]
+    return tuple(registry)
 
 
 def sort_and_validate_plugins(plugins):
@@ -5,11 +5,10 @@ from derex.runner.constants import MONGODB_ROOT_USER
 from derex.runner.constants import MYSQL_ROOT_USER
 from derex.runner.constants import ProjectBuildTargets
 from derex.runner.constants import SECRETS_CONF_FILENAME
-from derex.runner.docker_utils import image_exists
+from derex.runner.hashing import HashIndex
 from derex.runner.secrets import DerexSecrets
 from derex.runner.secrets import get_secret
 from derex.runner.themes import Theme
-from derex.runner.utils import get_dir_hash
 from enum import Enum
 from logging import getLogger
 from pathlib import Path
@@ -29,6 +28,7 @@ import yaml
 
 logger = getLogger(__name__)
 DEREX_RUNNER_PROJECT_DIR = ".derex"
+HASH_INDEX_FILENAME = "hash_index.json"
 
 
 class OpenEdXVersions(Enum):
@@ -81,6 +81,15 @@ class OpenEdXVersions(Enum):
     }
 
 
+# Services the project containers connect to, for every Open edX version.
+# They should match the hosts configured in the derex_django default settings.
+OPENEDX_VERSION_SERVICES: Dict[OpenEdXVersions, List[str]] = {
+    OpenEdXVersions.juniper: ["mysql", "mongodb", "rabbitmq"],
+    OpenEdXVersions.koa: ["mysql", "mongodb", "rabbitmq"],
+    OpenEdXVersions.lilac: ["mysql57", "mongodb4", "rabbitmq"],
+}
+
+
 class ProjectRunMode(Enum):
     debug = "debug"  # The first is the default
     production = "production"
@@ -169,6 +178,9 @@ class Project:
     # Enum containing possible settings modules
     _available_settings = None
 
+    # Memoized result of `get_project_hash`
+    _project_hash: Optional[str] = None
+
     @property
     def docker_image_name(self) -> str:
         """The image name of the image which should be run by ddc-project"""
@@ -197,6 +209,29 @@ class Project:
                 return final_image_name
         return self.base_image
 
+    @property
+    def required_services(self) -> List[str]:
+        """The services that need to be healthy before starting the project
+        containers, depending on the project Open edX version.
+        """
+        return list(OPENEDX_VERSION_SERVICES[self.openedx_version])
+
+    @property
+    def mysql_service(self) -> str:
+        """The name of the mysql service the project containers connect to."""
+        return next(
+            service for service in self.required_services if service.startswith("mysql")
+        )
+
+    @property
+    def mongodb_service(self) -> str:
+        """The name of the mongodb service the project containers connect to."""
+        return next(
+            service
+            for service in self.required_services
+            if service.startswith("mongodb")
+        )
+
     @property
     def mysql_db_name(self) -> str:
         return self.config.get("mysql_db_name", f"{self.name}_openedx")
@@ -307,18 +342,25 @@ class Project:
     def get_project_hash(self) -> Optional[str]:
         """An hash representing the current project state which will be used
         as a tag to the project docker images.
+        The result is memoized, and directory hashes are cached in the
+        project private directory so that unchanged directories are not
+        read again on subsequent runs.
         """
+        if self._project_hash is not None:
+            return self._project_hash
         should_hash = False
         hasher = hashlib.sha256()
+        hash_index = HashIndex(self.private_filepath(HASH_INDEX_FILENAME))
         for build_target in ProjectBuildTargets.__members__:
             build_directory = getattr(self, f"{build_target}_dir", None)
             if build_directory and build_directory.is_dir():
                 should_hash = True
-                directory_hash = get_dir_hash(build_directory)
+                directory_hash = hash_index.get_dir_hash(build_directory)
                 hasher.update(directory_hash.encode())
         if should_hash:
-            return hasher.hexdigest()[:6]
-        return None
+            hash_index.save()
+            self._project_hash = hasher.hexdigest()[:6]
+        return self._project_hash
 
     def _load_build_targets_directories(self):
         """Set all directories paths which are part of the build context on the Project object
@@ -332,8 +374,9 @@ class Project:
                 setattr(self, f"{build_target}_dir", build_target_dir_path)
 
     def get_build_target_image_tag(self, target: ProjectBuildTargets):
-        if self.get_project_hash():
-            return f"{self.image_prefix}-{target.name}:{self.get_project_hash()}"
+        project_hash = self.get_project_hash()
+        if project_hash:
+            return f"{self.image_prefix}-{target.name}:{project_hash}"
         return None
 
     def get_build_target_cache_image_tag(self, target: ProjectBuildTargets):
@@ -547,6 +590,16 @@ class Project:
         return themes
 
 
+def image_exists(needle: str) -> bool:
+    """See `derex.runner.docker_utils.image_exists`.
+    The docker utilities are imported only when needed, so that loading
+    a project does not require importing the docker library.
+    """
+    from derex.runner.docker_utils import image_exists as docker_image_exists
+
+    return docker_image_exists(needle)
+
+
 def find_project_root(path: Path) -> Path:
     """Find the project directory walking up the filesystem starting on the
     given path until a configuration file is found.
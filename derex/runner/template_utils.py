@@ -0,0 +1,66 @@
+"""Jinja environment shared by all derex templates.
+
+Templates are looked up in the `templates` and `compose_files` directories
+of the derex.runner distribution. Compiled templates are cached on disk
+under `DEREX_DIR`, in a directory specific to the derex version, so they
+are only parsed once per derex version.
+"""
+from derex.runner import __version__
+from derex.runner.constants import DDC_SERVICES_YML_PATH
+from derex.runner.constants import DEREX_TEMPLATES_DIR
+from derex.runner.local_appdir import DEREX_DIR
+from derex.runner.local_appdir import ensure_dir
+from functools import lru_cache
+from jinja2 import BytecodeCache
+from jinja2 import Environment
+from jinja2 import FileSystemBytecodeCache
+from jinja2 import FileSystemLoader
+from jinja2 import Template
+from pathlib import Path
+from typing import Optional
+
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+JINJA_CACHE_DIR = DEREX_DIR / "jinja_cache" / __version__
+
+
+@lru_cache(maxsize=None)
+def get_bytecode_cache() -> Optional[BytecodeCache]:
+    """Return the bytecode cache used for derex templates, or None
+    if the cache directory can't be created.
+    """
+    try:
+        ensure_dir(JINJA_CACHE_DIR)
+    except OSError as exc:
+        logger.debug(f"Jinja bytecode cache disabled: {exc}")
+        return None
+    return FileSystemBytecodeCache(str(JINJA_CACHE_DIR))
+
+
+@lru_cache(maxsize=None)
+def get_template_environment() -> Environment:
+    """Return the jinja environment to load derex templates."""
+    return Environment(
+        loader=FileSystemLoader(
+            [str(DEREX_TEMPLATES_DIR), str(DDC_SERVICES_YML_PATH.parent)]
+        ),
+        bytecode_cache=get_bytecode_cache(),
+    )
+
+
+def get_template(name: str) -> Template:
+    """Return the derex template with the given file name."""
+    return get_template_environment().get_template(name)
+
+
+@lru_cache(maxsize=None)
+def get_directory_template_environment(directory: Path) -> Environment:
+    """Return a jinja environment to load templates from the given directory,
+    sharing the derex bytecode cache.
+    """
+    return Environment(
+        loader=FileSystemLoader(str(directory)), bytecode_cache=get_bytecode_cache()
+    )
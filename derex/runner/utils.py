@@ -1,11 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 from pathlib import Path
-from rich.console import Console
-from rich.table import Table
 from typing import Any
+from typing import Callable
+from typing import Iterable
 from typing import Optional
 
-import hashlib
 import importlib_metadata
 import logging
 import os
@@ -31,19 +31,6 @@ def copydir(source: str, dest: str):
             shutil.copyfile(os.path.join(root, f), os.path.join(dest_path, f))
 
 
-def get_dir_hash(path: Path) -> str:
-    """Given a directory, return a hash of the contents of the text files it contains."""
-    hasher = hashlib.sha256()
-    logger.debug(
-        f"Calculating hash for dir {path}; initial (empty) hash is {hasher.hexdigest()}"
-    )
-    for path in sorted(path.iterdir()):
-        if path.is_file() and not path.name.endswith(".pyc"):
-            hasher.update(path.read_bytes())
-        logger.debug(f"Examined contents of {path}; hash so far: {hasher.hexdigest()}")
-    return hasher.hexdigest()
-
-
 truthy = frozenset(("t", "true", "y", "yes", "on", "1"))
 
 
@@ -75,11 +62,25 @@ def abspath_from_egg(egg: str, path: str) -> Optional[Path]:
 
 
 def get_rich_console(*args, **kwargs):
+    from rich.console import Console
+
     return Console(*args, **kwargs)
 
 
 def get_rich_table(*args, **kwargs):
+    from rich.table import Table
+
     return Table(*args, show_header=True, **kwargs)
 
 
+def run_concurrently(func: Callable, items: Iterable, max_workers: int):
+    """Call `func` on every item on a pool of `max_workers` threads.
+    If any call raises an exception, the first one is raised.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(func, item) for item in items]
+    for future in futures:
+        future.result()
+
+
 derex_path = partial(abspath_from_egg, "derex.runner")
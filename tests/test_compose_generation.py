@@ -11,3 +11,33 @@ def test_generate_ddc_test_compose(complete_project):
         assert "cypress" in compose_file.read_text()
         assert project.name in compose_file.read_text()
         assert "/complete/e2e:/e2e" in compose_file.read_text()
+
+
+def test_generate_ddc_project_compose_cache(minimal_project, mocker):
+    from derex.runner.compose_generation import generate_ddc_project_compose
+    from derex.runner.project import ProjectRunMode
+
+    mocker.patch("derex.runner.project.image_exists", return_value=False)
+    with minimal_project:
+        project = Project()
+        compose_file = generate_ddc_project_compose(project)
+        text = compose_file.read_text()
+        mtime = compose_file.stat().st_mtime_ns
+
+        # When nothing changed the template should not be rendered again
+        get_template = mocker.patch("derex.runner.compose_generation.get_template")
+        assert generate_ddc_project_compose(Project()) == compose_file
+        get_template.assert_not_called()
+        assert compose_file.stat().st_mtime_ns == mtime
+        mocker.stop(get_template)
+
+        # Changing the runmode should generate a new file
+        project.runmode = ProjectRunMode.production
+        generate_ddc_project_compose(Project())
+        assert compose_file.read_text() != text
+        assert "restart: unless-stopped" in compose_file.read_text()
+
+        # A removed file should be generated again
+        compose_file.unlink()
+        generate_ddc_project_compose(Project())
+        assert "restart: unless-stopped" in compose_file.read_text()
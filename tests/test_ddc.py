@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 """Tests for `derex.runner.ddc` module."""
+from types import SimpleNamespace
 
+import derex.runner.plugins
 import logging
 import os
 import pytest
@@ -35,22 +37,149 @@ def test_ddc_services(sys_argv, capsys, monkeypatch, complete_project):
     assert "my-overridden-secret-password" in output
 
 
+def test_ddc_services_plugin_volumes(mocker):
+    from derex.runner import hookimpl
+    from derex.runner.ddc import run_ddc_services
+    from derex.runner.docker_utils import VOLUMES
+    from derex.runner.plugins import setup_plugin_manager
+
+    class AddonServices:
+        @staticmethod
+        @hookimpl
+        def ddc_services_volumes():
+            """See derex.runner.plugin_spec.ddc_services_volumes docstring"""
+            return ["derex_addon"]
+
+    def setup_plugin_manager_with_addon():
+        plugin_manager = setup_plugin_manager()
+        plugin_manager.register(AddonServices)
+        return plugin_manager
+
+    mocker.patch(
+        "derex.runner.ddc.get_plugin_manager",
+        side_effect=setup_plugin_manager_with_addon,
+    )
+    ensure_volumes_present = mocker.patch("derex.runner.ddc.ensure_volumes_present")
+    mocker.patch("derex.runner.ddc.run_docker_compose")
+
+    run_ddc_services(["config"])
+    ensure_volumes_present.assert_called_once_with(VOLUMES | {"derex_addon"})
+
+
+def test_ddc_plugins_argv(mocker, minimal_project, caplog):
+    from derex.runner.ddc import get_ddc_project_argv
+    from derex.runner.ddc import get_ddc_services_argv
+    from derex.runner.plugins import get_plugin_manager
+    from derex.runner.project import Project
+    from derex.runner.project import ProjectRunMode
+
+    mocker.patch("derex.runner.ddc.ensure_volumes_present")
+    setup_plugin_manager = mocker.spy(derex.runner.plugins, "setup_plugin_manager")
+    with minimal_project:
+        project = Project()
+        with caplog.at_level(logging.DEBUG):
+            project_argv = get_ddc_project_argv(project)
+        assert get_ddc_project_argv(project) == project_argv
+        assert "--project-name" in project_argv
+
+        services_argv = get_ddc_services_argv()
+        assert get_ddc_services_argv() == services_argv
+        assert setup_plugin_manager.call_count == 1
+        assert get_plugin_manager() is get_plugin_manager()
+
+        # Per plugin hook durations are logged in debug mode
+        assert "Plugin BaseProject ran ddc_project_options in" in caplog.text
+
+        # Plugins are asked on every call, so they can see any change
+        project_hook = mocker.spy(get_plugin_manager().hook, "ddc_project_options")
+        project.runmode = ProjectRunMode.production
+        assert get_ddc_project_argv(Project()) == project_argv
+        get_ddc_project_argv(Project())
+        assert project_hook.call_count == 2
+
+
+def test_parse_compose_argv():
+    from derex.runner.compose_utils import parse_compose_argv
+
+    options, handler, command_options = parse_compose_argv(
+        ["--project-name", "derex_services", "up", "-d", "minio"]
+    )
+    assert options["--project-name"] == "derex_services"
+    assert options["COMMAND"] == "up"
+    assert handler.__name__ == "up"
+    assert command_options["--detach"]
+    assert command_options["SERVICE"] == ["minio"]
+
+
+def test_compose_project(mocker, capsys):
+    from derex.runner.compose_utils import ComposeProject
+
+    handlers = {"run": mocker.Mock(), "up": mocker.Mock(), "exec": mocker.Mock()}
+    mocker.patch(
+        "derex.runner.compose_utils.parse_compose_argv",
+        side_effect=lambda argv: (
+            {"COMMAND": argv[2]},
+            handlers[argv[2]],
+            {"ARGS": argv[3:]},
+        ),
+    )
+    project_from_options = mocker.patch(
+        "derex.runner.compose_utils.project_from_options"
+    )
+    top_level_command = mocker.patch("derex.runner.compose_utils.TopLevelCommand")
+
+    compose_project = ComposeProject(["-f", "services.yml"])
+    compose_project.run(["--rm", "minio", "sh"])
+    compose_project.up(["-d", "minio"])
+    compose_project.exec(["minio", "sh"])
+
+    # The compose files are only loaded once
+    project_from_options.assert_called_once_with(".", {"COMMAND": "run"})
+    assert top_level_command.call_count == 3
+    handlers["up"].assert_called_once_with(
+        top_level_command.return_value, {"ARGS": ["-d", "minio"]}
+    )
+
+    # A command exiting with a non zero status raises a RuntimeError
+    handlers["up"].side_effect = lambda *args: sys.exit(1)
+    with pytest.raises(RuntimeError):
+        compose_project.up()
+
+    # And so do the errors docker-compose handles
+    from compose.service import BuildError
+    from compose.service import OperationFailedError
+
+    handlers["up"].side_effect = OperationFailedError("minio failed")
+    with pytest.raises(RuntimeError, match="minio failed"):
+        compose_project.up()
+    handlers["up"].side_effect = BuildError(SimpleNamespace(name="minio"), "no disk")
+    with pytest.raises(RuntimeError, match="Service 'minio' failed to build: no disk"):
+        compose_project.up()
+
+    capsys.readouterr()
+    ComposeProject(["-f", "services.yml"], dry_run=True).up(["-d"])
+    assert "docker-compose -f services.yml up -d" in capsys.readouterr().out
+    assert project_from_options.call_count == 1
+
+
 def test_ddc_project_minimal(sys_argv, mocker, minimal_project, capsys):
     from derex.runner.ddc import ddc_project
+    from derex.runner.project import Project
 
     """Test the open edx docker compose shortcut."""
     # It should check for services to be up before trying to do anything
-    wait_for_service = mocker.patch("derex.runner.ddc.wait_for_service")
+    wait_for_services = mocker.patch("derex.runner.ddc.wait_for_services")
 
     with minimal_project:
         for param in ["up", "start"]:
-            wait_for_service.return_value = 0
-            wait_for_service.side_effect = None
+            wait_for_services.return_value = {"mysql": 0.1}
+            wait_for_services.side_effect = None
             with sys_argv(["ddc-project", param, "--dry-run"]):
                 ddc_project()
             assert "Would have run" in capsys.readouterr().out
+            wait_for_services.assert_called_with(Project().required_services)
 
-            wait_for_service.side_effect = RuntimeError(
+            wait_for_services.side_effect = RuntimeError(
                 "mysql service not found.\n"
                 "Maybe you forgot to run\n"
                 "ddc-services up -d"
@@ -86,7 +215,7 @@ def test_ddc_project_symlink_mounting(sys_argv, mocker, complete_project, capsys
     from derex.runner.ddc import ddc_project
     from derex.runner.project import Project
 
-    mocker.patch("derex.runner.ddc.wait_for_service", return_value=0)
+    mocker.patch("derex.runner.ddc.wait_for_services", return_value={})
     with complete_project:
         with sys_argv(["ddc-project", "config"]):
             ddc_project()
@@ -102,6 +231,16 @@ def test_ddc_project_symlink_mounting(sys_argv, mocker, complete_project, capsys
         assert any(el.startswith(str(symlink_target_path)) for el in volumes)
 
 
+@pytest.fixture(autouse=True)
+def reset_plugins_cache(mocker):
+    """Don't reuse the plugin manager across tests."""
+    from derex.runner.plugins import get_plugin_manager
+
+    get_plugin_manager.cache_clear()
+    yield
+    get_plugin_manager.cache_clear()
+
+
 @pytest.fixture(autouse=True)
 def reset_root_logger():
     """The logging setup of docker-compose does not expect main() to be invoked
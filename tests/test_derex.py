@@ -8,10 +8,26 @@ from derex.runner.project import Project
 
 import os
 import pytest
+import subprocess
+import sys
 
 
 runner = CliRunner(mix_stderr=False)
 
+# Modules that should not be imported just to run `derex --help`
+HEAVY_MODULES = {
+    "compose",
+    "docker",
+    "jinja2",
+    "pymongo",
+    "pymysql",
+    "python_on_whales",
+    "rich",
+}
+
+# Maximum time (in microseconds) importing the `derex` entry point should take
+IMPORT_TIME_BUDGET = 500000
+
 
 @pytest.mark.slowtest
 def test_derex_compile_theme(complete_project):
@@ -133,6 +149,50 @@ def test_derex_cli_group_one_container_running(monkeypatch):
     )
 
 
+def run_with_importtime(code: str) -> subprocess.CompletedProcess:
+    """Run the given python code in a new interpreter with `-X importtime`."""
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+        check=True,
+    )
+
+
+def parse_importtime(output: str) -> dict:
+    """Parse the output of `python -X importtime` and return a dictionary
+    mapping module names to their cumulative import time in microseconds.
+    """
+    result = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.replace("import time:", "", 1).split("|")
+        result[name.strip()] = int(cumulative)
+    return result
+
+
+def test_derex_import_time():
+    result = run_with_importtime("import derex.runner.cli")
+    import_times = parse_importtime(result.stderr)
+
+    print(f"derex.runner.cli imported in {import_times['derex.runner.cli']}us")
+    assert import_times["derex.runner.cli"] < IMPORT_TIME_BUDGET
+    assert not HEAVY_MODULES & set(import_times)
+
+
+def test_derex_help_is_import_light():
+    result = run_with_importtime(
+        "from derex.runner.cli import derex; derex(['--help'], standalone_mode=False)"
+    )
+    import_times = parse_importtime(result.stderr)
+
+    assert "mysql" in result.stdout
+    assert "translations" in result.stdout
+    assert not HEAVY_MODULES & set(import_times)
+
+
 @pytest.fixture(autouse=True)
 def fix_terminal_width(monkeypatch):
     from rich.console import Console
@@ -143,3 +203,26 @@ def fix_terminal_width(monkeypatch):
     import rich
 
     monkeypatch.setattr(rich.console, "Console", wrapper)
+
+
+def test_derex_debug_plugins(minimal_project, tmp_path):
+    import json
+
+    with minimal_project:
+        result = runner.invoke(derex_cli_group, ["debug", "plugins"])
+        assert_result_ok(result)
+        assert "LocalProjectRunmode" in result.output
+
+        json_path = tmp_path / "plugins.json"
+        result = runner.invoke(
+            derex_cli_group,
+            ["debug", "plugins", "--profile", "--json", str(json_path)],
+        )
+        assert_result_ok(result)
+        assert "ddc_project_options" in result.output
+        trace = json.loads(json_path.read_text())
+        assert {record["plugin"] for record in trace["hooks"]} >= {
+            "BaseProject",
+            "BaseServices",
+        }
+        assert all(record["calls"] == 1 for record in trace["hooks"])
@@ -4,6 +4,7 @@ from types import SimpleNamespace
 
 import docker
 import pytest
+import time
 
 
 def test_ensure_volumes_present(mocker):
@@ -14,15 +15,21 @@ def test_ensure_volumes_present(mocker):
 
     client.volumes.list.return_value = []
     ensure_volumes_present()
-    assert client.volumes.create.call_count > 3
+    assert client.volumes.create.call_count == len(VOLUMES)
     client.volumes.create.assert_any_call("derex_mysql")
     client.volumes.create.assert_any_call("derex_mongodb")
+    # Volumes are looked up with a single query filtered by name
+    client.volumes.list.assert_called_once_with(filters={"name": sorted(VOLUMES)})
 
-    client.volumes.create.reset_mock()
+    client.reset_mock()
     client.volumes.list.return_value = [SimpleNamespace(name=name) for name in VOLUMES]
     ensure_volumes_present()
     client.volumes.create.assert_not_called()
 
+    # Substring matches of the name filter don't count
+    ensure_volumes_present(VOLUMES | {"derex_mysql5"})
+    client.volumes.create.assert_called_once_with("derex_mysql5")
+
 
 def test_check_services(mocker):
     from derex.runner.docker_utils import check_services
@@ -81,18 +88,572 @@ def test_wait_for_service(mocker):
         wait_for_service("service", 1)
 
 
-def test_get_final_image(mocker, minimal_project):
-    from derex.runner.docker_utils import image_exists
+def test_wait_for_service_events(mocker):
+    from derex.runner.docker_utils import wait_for_service
+
+    api_client = mocker.patch("derex.runner.docker_utils.client.api")
+    starting = {"State": {"Status": "running", "Health": {"Status": "starting"}}}
+    healthy = {"State": {"Status": "running", "Health": {"Status": "healthy"}}}
+    api_client.inspect_container.side_effect = [starting, starting, healthy]
+    api_client.events.return_value = mocker.MagicMock(
+        __iter__=lambda self: iter(
+            [
+                {"status": "health_status: starting"},
+                {"status": "health_status: healthy"},
+            ]
+        )
+    )
+    sleep = mocker.patch("derex.runner.docker_utils.time.sleep")
+
+    # The service is reported healthy as soon as the event is received
+    assert wait_for_service("mysql", 10) == 0
+    sleep.assert_not_called()
+    assert api_client.events.call_args.kwargs["filters"]["container"] == "mysql"
+    api_client.events.return_value.close.assert_called_once()
+
+    # The container is polled if events are not available
+    api_client.inspect_container.side_effect = [starting, starting, healthy]
+    api_client.events.side_effect = docker.errors.APIError("events not available")
+    assert wait_for_service("mysql", 10) == 0
+    assert sleep.call_count == 2
+    assert sleep.call_args_list[0].args[0] < sleep.call_args_list[1].args[0]
+
+
+def test_wait_for_services(mocker):
+    from derex.runner.docker_utils import wait_for_services
+
+    import threading
+
+    ready_at = {"mysql": 3.0, "mongodb": 1.0, "rabbitmq": 2.0, "elasticsearch": 5.0}
+    # The clock reads 100 when waiting starts, and the time the service
+    # became ready in the thread waiting for it
+    clock = {}
+    all_waiting = threading.Barrier(len(ready_at), timeout=10)
+
+    def wait_for_service(service, max_seconds):
+        # Only passes once all services are being waited for at the same time
+        all_waiting.wait()
+        clock[threading.get_ident()] = 100 + ready_at[service]
+        return 0
+
+    mocker.patch(
+        "derex.runner.docker_utils.wait_for_service", side_effect=wait_for_service
+    )
+    time = mocker.patch("derex.runner.docker_utils.time")
+    time.monotonic.side_effect = lambda: clock.get(threading.get_ident(), 100.0)
+
+    # Services are waited for concurrently
+    assert wait_for_services(ready_at) == ready_at
+
+    # A failure is reported without waiting for the other services
+    mysql_ready = threading.Event()
+
+    def wait_for_broken_service(service, max_seconds):
+        if service == "broken":
+            raise RuntimeError(f"{service} service not found.")
+        mysql_ready.wait(10)
+        return 0
 
     mocker.patch(
-        "derex.runner.docker_utils.docker.APIClient",
-        return_value=mocker.Mock(
-            images=mocker.Mock(return_value=DOCKER_DAEMON_IMAGES_RESPONSE)
-        ),
+        "derex.runner.docker_utils.wait_for_service",
+        side_effect=wait_for_broken_service,
+    )
+    with pytest.raises(RuntimeError):
+        wait_for_services(["mysql", "broken"])
+    mysql_ready.set()
+
+
+def test_docker_ignore():
+    from derex.runner.docker_utils import DockerIgnore
+
+    ignore = DockerIgnore(
+        [
+            "# Comment",
+            "",
+            "/themes/*/node_modules",
+            "**/*.pyc",
+            "requirements/*.t?t",
+            "!requirements/keep.txt",
+        ]
+    )
+    assert ignore.is_excluded("themes/my-theme/node_modules")
+    assert ignore.is_excluded("themes/my-theme/node_modules/package/index.js")
+    assert not ignore.is_excluded("themes/my-theme/lms/node_modules")
+    assert ignore.is_excluded("module.pyc")
+    assert ignore.is_excluded("requirements/package/module.pyc")
+    assert ignore.is_excluded("requirements/base.txt")
+    assert not ignore.is_excluded("requirements/keep.txt")
+    assert not ignore.is_excluded("requirements/package/base.txt")
+    assert ignore.has_exceptions
+    assert not DockerIgnore([]).is_excluded("themes")
+
+
+def test_prepare_build_context(tmp_path):
+    from derex.runner.docker_utils import prepare_build_context
+
+    project = tmp_path / "project"
+    themes = project / "themes"
+    (themes / "my-theme" / "node_modules").mkdir(parents=True)
+    (themes / "my-theme" / "node_modules" / "index.js").write_text("")
+    (themes / "my-theme" / "empty").mkdir()
+    (themes / "my-theme" / "main.scss").write_text("body {}")
+    (project / ".dockerignore").write_text("themes/*/node_modules\n")
+    package = tmp_path / "package"
+    package.mkdir()
+    (package / "setup.py").write_text("from setuptools import setup")
+    requirements = project / "requirements"
+    requirements.mkdir()
+    (requirements / "base.txt").write_text("-e package")
+    (requirements / "package").symlink_to(package)
+    other_requirements = tmp_path / "other" / "requirements"
+    other_requirements.mkdir(parents=True)
+    (other_requirements / "base.txt").write_text("Django")
+    context = tmp_path / "context"
+    context.mkdir()
+
+    linked, copied = prepare_build_context(
+        [themes, requirements, other_requirements], context
     )
+
+    assert (linked, copied) == (3, 0)
+    main_scss = context / "themes" / "my-theme" / "main.scss"
+    assert main_scss.read_text() == "body {}"
+    # Files are hardlinked instead of copied
+    assert main_scss.stat().st_ino == (themes / "my-theme" / "main.scss").stat().st_ino
+    assert (context / "themes" / "my-theme" / "empty").is_dir()
+    assert not (context / "themes" / "my-theme" / "node_modules").exists()
+    # Symlinks are followed
+    assert (context / "requirements" / "package" / "setup.py").is_file()
+    # Directories with the same name are merged
+    assert (context / "requirements" / "base.txt").read_text() == "Django"
+    assert (requirements / "base.txt").read_text() == "-e package"
+
+
+def test_prepare_build_context_exceptions_and_shared_symlinks(tmp_path):
+    from derex.runner.docker_utils import prepare_build_context
+
+    project = tmp_path / "project"
+    themes = project / "themes"
+    (themes / "foo" / "sub").mkdir(parents=True)
+    (themes / "foo" / "sub" / "keep.txt").write_text("keep")
+    (themes / "foo" / "drop.txt").write_text("drop")
+    (project / ".dockerignore").write_text("themes/foo\n!themes/foo/sub/keep.txt\n")
+    static = tmp_path / "static"
+    static.mkdir()
+    (static / "main.css").write_text("body {}")
+    for theme in ("one", "two"):
+        (themes / theme).mkdir()
+        (themes / theme / "static").symlink_to(static)
+    context = tmp_path / "context"
+    context.mkdir()
+
+    assert prepare_build_context([themes], context) == (3, 0)
+    # Files included by an exception are linked into excluded directories
+    assert (context / "themes" / "foo" / "sub" / "keep.txt").read_text() == "keep"
+    assert not (context / "themes" / "foo" / "drop.txt").exists()
+    # A directory reached through two symlinks is included under both paths
+    assert (context / "themes" / "one" / "static" / "main.css").is_file()
+    assert (context / "themes" / "two" / "static" / "main.css").is_file()
+
+
+def test_prepare_build_context_copy_fallback(tmp_path, mocker):
+    from derex.runner.docker_utils import prepare_build_context
+
+    import errno
+
+    themes = tmp_path / "themes"
+    themes.mkdir()
+    (themes / "main.scss").write_text("body {}")
+    context = tmp_path / "context"
+    context.mkdir()
+    mocker.patch(
+        "derex.runner.docker_utils.os.link",
+        side_effect=OSError(errno.EXDEV, "Invalid cross-device link"),
+    )
+
+    assert prepare_build_context([themes], context) == (0, 1)
+    assert (context / "themes" / "main.scss").read_text() == "body {}"
+
+
+def test_buildx_image_templates(tmp_path, mocker, minimal_project):
+    from derex.runner.docker_utils import buildx_image
+
+    pow_docker = mocker.patch("python_on_whales.docker")
+    contexts = []
+    pow_docker.buildx.build.side_effect = lambda context_path, **kwargs: (
+        contexts.append(
+            {path.name: path.read_text() for path in context_path.iterdir()}
+        )
+    )
+    directory = tmp_path / "microfrontend"
+    directory.mkdir()
+    (directory / "env.config").write_text("original")
+    (directory / "env.config.j2").write_text("{{ project.name }}")
+
     with minimal_project:
+        buildx_image(
+            "FROM scratch",
+            [directory / "env.config", directory / "env.config.j2"],
+            target="final",
+            output="docker",
+            tags=["test"],
+            pull=False,
+            cache=False,
+            cache_from=False,
+            cache_to=False,
+            cache_tag=False,
+        )
+
+    assert contexts[0]["env.config"].endswith("minimal")
+    # Rendering a template does not modify files linked in the context
+    assert (directory / "env.config").read_text() == "original"
+
+
+@pytest.mark.slowtest
+def test_prepare_build_context_benchmark(tmp_path):
+    """Compare copying a synthetic 20k files theme tree with `copytree`
+    with preparing a build context from it.
+    """
+    from derex.runner.docker_utils import prepare_build_context
+    from shutil import copytree
+
+    import os
+    import time
+
+    themes = tmp_path / "project" / "themes"
+    for i in range(20000):
+        directory = themes / f"theme_{i % 10}" / f"static_{i % 50}"
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"file_{i}.css").write_bytes(os.urandom(4096))
+
+    start = time.perf_counter()
+    copytree(themes, tmp_path / "copy" / "themes")
+    copied = time.perf_counter() - start
+
+    context = tmp_path / "project" / "context"
+    context.mkdir()
+    start = time.perf_counter()
+    prepare_build_context([themes], context)
+    prepared = time.perf_counter() - start
+
+    print(f"Preparing 20k files: copytree {copied:.3f}s, context {prepared:.3f}s")
+    assert prepared < copied
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_stream_build_context(tmp_path, compress):
+    from derex.runner.docker_utils import stream_build_context
+
+    import io
+    import tarfile
+
+    themes = tmp_path / "themes"
+    (themes / "my-theme").mkdir(parents=True)
+    (themes / "my-theme" / "main.scss").write_text("body {}")
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text("Django")
+
+    context = b"".join(
+        stream_build_context(
+            "FROM scratch # ✓", [str(themes), str(requirements)], compress
+        )
+    )
+
+    with tarfile.open(fileobj=io.BytesIO(context), mode="r:*") as context_tar:
+        assert (
+            context_tar.extractfile("Dockerfile").read().decode() == "FROM scratch # ✓"
+        )
+        assert context_tar.extractfile("themes/my-theme/main.scss").read() == b"body {}"
+        assert context_tar.extractfile("requirements.txt").read() == b"Django"
+    # Gzip magic number
+    assert (context[:2] == b"\x1f\x8b") == compress
+
+
+def test_stream_build_context_bounded_memory(tmp_path):
+    from derex.runner.docker_utils import stream_build_context
+
+    import os
+    import tracemalloc
+
+    big_file = tmp_path / "big.tar"
+    with big_file.open("wb") as fh:
+        for _ in range(32):
+            fh.write(os.urandom(1024 * 1024))
+
+    tracemalloc.start()
+    try:
+        size = sum(len(chunk) for chunk in stream_build_context("", [str(big_file)]))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert size > 32 * 1024 * 1024
+    assert peak < 8 * 1024 * 1024
+
+
+def test_stream_build_context_closed_early(tmp_path, mocker):
+    from derex.runner.docker_utils import stream_build_context
+
+    import os
+    import tarfile
+    import threading
+
+    files = tmp_path / "files"
+    files.mkdir()
+    for index in range(200):
+        (files / str(index)).write_bytes(os.urandom(64 * 1024))
+    add = mocker.spy(tarfile.TarFile, "addfile")
+    thread_class = mocker.spy(threading, "Thread")
+
+    stream = stream_build_context("", [str(files)])
+    next(stream)
+    stream.close()
+    # The thread writing the context stops instead of reading all files
+    producer = thread_class.spy_return
+    assert not producer.is_alive()
+    producer.join(10)
+    assert add.call_count < 100
+
+
+def test_build_image_streams_context(mocker):
+    from derex.runner.docker_utils import build_image
+
+    import types
+
+    client = mocker.patch("derex.runner.docker_utils.client")
+    client.api.build.return_value = []
+    client.api.info.return_value = {}
+
+    client.api.base_url = "http+docker://localhost"
+    build_image("FROM scratch", [], "test:latest")
+    kwargs = client.api.build.call_args.kwargs
+    assert isinstance(kwargs["fileobj"], types.GeneratorType)
+    assert kwargs["encoding"] is None
+
+    client.api.base_url = "https://docker.example.com:2376"
+    build_image("FROM scratch", [], "test:latest")
+    assert client.api.build.call_args.kwargs["encoding"] == "gzip"
+
+
+def pull_events(image_name, layers, barrier):
+    """Generate the events of the docker pull stream for an image
+    with the given layers (a dictionary of layer ids and sizes).
+    Layers are only downloaded once all the pulls sharing the given
+    barrier have started.
+    """
+    yield {"status": f"Pulling from {image_name}", "id": "latest"}
+    barrier.wait()
+    for layer_id, size in layers.items():
+        for current in (size // 2, size):
+            detail = {"current": current, "total": size}
+            yield {"status": "Downloading", "progressDetail": detail, "id": layer_id}
+        yield {"status": "Download complete", "progressDetail": {}, "id": layer_id}
+        yield {"status": "Pull complete", "progressDetail": {}, "id": layer_id}
+    yield {"status": f"Downloaded newer image for {image_name}"}
+
+
+def test_pull_images(mocker):
+    from derex.runner.docker_utils import pull_images
+
+    import threading
+
+    images_layers = {
+        "derex/openedx-koa-dev": {"base": 1000, "dev": 500},
+        "derex/openedx-koa-nostatic": {"base": 1000, "nostatic": 200},
+        "mysql:5.7.34": {"mysql": 300},
+    }
+    # Pulls can only complete if all three are running at the same time
+    all_pulling = threading.Barrier(len(images_layers), timeout=10)
+    client = mocker.patch("derex.runner.docker_utils.client")
+    client.api.pull.side_effect = lambda image_name, **kwargs: pull_events(
+        image_name, images_layers[image_name], all_pulling
+    )
+    image_index = mocker.patch("derex.runner.docker_utils.image_index")
+
+    stats = pull_images(list(images_layers) + ["mysql:5.7.34"])
+
+    # Images are pulled concurrently, and only once
+    assert client.api.pull.call_count == 3
+    assert not all_pulling.broken
+    # The shared layer is accounted to one image only
+    assert stats["mysql:5.7.34"]["bytes"] == 300
+    assert (
+        stats["derex/openedx-koa-dev"]["bytes"]
+        + stats["derex/openedx-koa-nostatic"]["bytes"]
+        == 1700
+    )
+    image_index.invalidate.assert_any_call("mysql:5.7.34")
+
+    client.api.pull.side_effect = lambda image_name, **kwargs: iter(
+        [{"error": f"manifest for {image_name} not found"}]
+    )
+    with pytest.raises(docker.errors.APIError):
+        pull_images(["derex/openedx-koa-dev:nonexistent"])
+
+
+def test_get_final_image(mocker, complete_project):
+    from derex.runner.docker_utils import image_index
+
+    client = mocker.patch("derex.runner.docker_utils.client")
+    client.api.images.return_value = DOCKER_DAEMON_IMAGES_RESPONSE
+    image_index.invalidate()
+    with complete_project:
         project = Project()
-        image_exists(project)
+        assert project.docker_image_name == project.base_image
+        assert project.docker_image_name == project.base_image
+    # Images are listed once per repository
+    client.api.images.assert_called_once()
+    image_index.invalidate()
+
+
+def test_image_index(mocker):
+    from derex.runner.docker_utils import build_image
+    from derex.runner.docker_utils import image_exists
+    from derex.runner.docker_utils import image_index
+    from derex.runner.docker_utils import split_image_tag
+
+    assert split_image_tag("derex/openedx-koa") == ("derex/openedx-koa", "latest")
+    assert split_image_tag("registry:5000/project:abc") == (
+        "registry:5000/project",
+        "abc",
+    )
+    assert split_image_tag("registry:5000/project") == (
+        "registry:5000/project",
+        "latest",
+    )
+
+    client = mocker.patch("derex.runner.docker_utils.client")
+    client.api.images.side_effect = lambda name: [
+        image
+        for image in DOCKER_DAEMON_IMAGES_RESPONSE
+        if any(tag.startswith(f"{name}:") for tag in image["RepoTags"] or [])
+    ]
+    image_index.invalidate()
+
+    assert image_exists("derex/openedx-koa-dev:0.3.0")
+    assert image_exists("derex/openedx-koa-dev:latest")
+    assert not image_exists("derex/openedx-koa-dev:0.0.1")
+    assert not image_exists("project/openedx-final:abc")
+    assert client.api.images.call_count == 2
+    client.api.images.assert_any_call(name="derex/openedx-koa-dev")
+    assert image_index.get("derex/openedx-koa-dev")["Id"] == "sha256:koa"
+
+    # Building an image invalidates the index for its repository
+    client.api.build.return_value = []
+    client.api.images.reset_mock()
+    build_image("FROM scratch", [], "project/openedx-final:abc", compress=False)
+    assert not image_exists("project/openedx-final:abc")
+    assert image_exists("derex/openedx-koa-dev:0.3.0")
+    client.api.images.assert_called_once_with(name="project/openedx-final")
+    image_index.invalidate()
+
+
+class FakeDockerAPI:
+    """A stand-in for the docker low level API client, answering
+    with the given latency to the calls used to find running containers.
+    """
+
+    def __init__(self, containers, latency=0.0):
+        self._containers = containers
+        self.latency = latency
+        self.calls = 0
+
+    def _call(self):
+        self.calls += 1
+        time.sleep(self.latency)
+
+    def containers(self, filters):
+        self._call()
+        return [{"Names": [f"/{name}"]} for name in self._containers]
+
+    def inspect_container(self, name):
+        self._call()
+        if name not in self._containers:
+            raise docker.errors.NotFound(name)
+        return self._containers[name]
+
+
+def container_info(alias, ip_address):
+    return {
+        "NetworkSettings": {
+            "Networks": {"derex": {"Aliases": [alias], "IPAddress": ip_address}}
+        }
+    }
+
+
+@pytest.fixture
+def fake_docker_api(mocker):
+    """Replace the docker API client with a `FakeDockerAPI` and
+    forget running containers cached by previous tests.
+    """
+    containers = {
+        f"project{i}_lms_1": container_info(
+            f"project{i}.localhost.derex", f"172.11.0.{i}"
+        )
+        for i in range(40)
+    }
+    fake_api = FakeDockerAPI(containers)
+    mocker.patch("derex.runner.docker_utils.client").api = fake_api
+    mocker.patch(
+        "derex.runner.docker_utils._running_containers_cache", new=(float("-inf"), {})
+    )
+    return fake_api
+
+
+def test_get_running_containers(fake_docker_api, mocker):
+    from derex.runner.docker_utils import get_exposed_container_names
+    from derex.runner.docker_utils import get_running_containers
+
+    containers = get_running_containers()
+    assert containers == fake_docker_api._containers
+    # One call to list the containers, and one to inspect each of them
+    assert fake_docker_api.calls == 41
+
+    # The result is reused for a short while
+    assert len(get_exposed_container_names()) == 40
+    assert fake_docker_api.calls == 41
+
+    # Containers that disappear before being inspected are skipped
+    mocker.patch("derex.runner.docker_utils.RUNNING_CONTAINERS_CACHE_TTL", new=0)
+    fake_docker_api.containers = lambda filters: [
+        {"Names": ["/project0_lms_1"]},
+        {"Names": ["/gone_lms_1"]},
+    ]
+    assert list(get_running_containers()) == ["project0_lms_1"]
+
+
+@pytest.mark.slowtest
+def test_get_running_containers_benchmark(fake_docker_api):
+    """Compare inspecting 40 containers one at a time with
+    `get_running_containers`, with 5ms of latency per API call.
+    """
+    from derex.runner.docker_utils import get_running_containers
+
+    fake_docker_api.latency = 0.005
+
+    start = time.perf_counter()
+    sequential = {
+        container["Names"][0][1:]: fake_docker_api.inspect_container(
+            container["Names"][0][1:]
+        )
+        for container in fake_docker_api.containers(filters={"network": "derex"})
+    }
+    sequential_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    concurrent = get_running_containers()
+    concurrent_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    get_running_containers()
+    cached_time = time.perf_counter() - start
+
+    print(
+        f"Inspecting 40 containers: sequential {sequential_time:.3f}s, "
+        f"concurrent {concurrent_time:.3f}s, cached {cached_time:.6f}s"
+    )
+    assert concurrent == sequential
+    assert concurrent_time < sequential_time
+    assert cached_time < concurrent_time
 
 
 DOCKER_DAEMON_IMAGES_RESPONSE = [
@@ -109,5 +670,17 @@ DOCKER_DAEMON_IMAGES_RESPONSE = [
         "SharedSize": -1,
         "Size": 1665836550,
         "VirtualSize": 1665836550,
-    }
+    },
+    {
+        "Containers": -1,
+        "Created": 1628757938,
+        "Id": "sha256:koa",
+        "Labels": None,
+        "ParentId": "",
+        "RepoDigests": [],
+        "RepoTags": ["derex/openedx-koa-dev:0.3.0", "derex/openedx-koa-dev:latest"],
+        "SharedSize": -1,
+        "Size": 1665836550,
+        "VirtualSize": 1665836550,
+    },
 ]
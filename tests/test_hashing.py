@@ -0,0 +1,160 @@
+from derex.runner.hashing import get_dir_hash
+from derex.runner.hashing import get_file_hash
+from derex.runner.hashing import HashIndex
+from derex.runner.hashing import iter_dir_files
+
+import derex.runner.hashing
+import hashlib
+import os
+import pytest
+import time
+
+
+def test_hash_index(tmp_path, mocker):
+    directory = tmp_path / "themes"
+    directory.mkdir()
+    (directory / "one.txt").write_text("one")
+    (directory / "two.txt").write_text("two")
+    index_path = tmp_path / "hash_index.json"
+
+    index = HashIndex(index_path)
+    expected_hash = get_dir_hash(directory)
+    assert index.get_dir_hash(directory) == expected_hash
+    index.save()
+    assert index_path.is_file()
+
+    # A new index loaded from disk should not read the files again
+    get_file_hash_mock = mocker.patch("derex.runner.hashing.get_file_hash")
+    assert HashIndex(index_path).get_dir_hash(directory) == expected_hash
+    get_file_hash_mock.assert_not_called()
+    mocker.stopall()
+
+    # Changing a file should only cause that file to be hashed again
+    (directory / "two.txt").write_text("changed")
+    get_file_hash_spy = mocker.spy(derex.runner.hashing, "get_file_hash")
+    new_hash = HashIndex(index_path).get_dir_hash(directory)
+    assert new_hash != expected_hash
+    get_file_hash_spy.assert_any_call(directory / "two.txt")
+    assert directory / "one.txt" not in [
+        call.args[0] for call in get_file_hash_spy.call_args_list
+    ]
+    mocker.stopall()
+    assert new_hash == get_dir_hash(directory)
+
+
+def test_hash_index_corrupted(tmp_path):
+    directory = tmp_path / "settings"
+    directory.mkdir()
+    (directory / "base.py").write_text("DEBUG = True\n")
+    index_path = tmp_path / "hash_index.json"
+    index_path.write_text("not json")
+
+    index = HashIndex(index_path)
+    assert index.get_dir_hash(directory) == get_dir_hash(directory)
+    index.save()
+    assert HashIndex(index_path).get_dir_hash(directory) == get_dir_hash(directory)
+
+
+def test_get_dir_hash_recursive(tmp_path):
+    directory = tmp_path / "themes"
+    (directory / "my-theme" / "lms" / "static").mkdir(parents=True)
+    nested_file = directory / "my-theme" / "lms" / "static" / "main.scss"
+    nested_file.write_text("body { color: red; }")
+    (directory / "README.md").write_text("Themes")
+    initial_hash = get_dir_hash(directory)
+
+    # Changes in subdirectories change the hash
+    nested_file.write_text("body { color: blue; }")
+    assert get_dir_hash(directory) != initial_hash
+
+    # Compiled python files and their caches are ignored
+    nested_file.write_text("body { color: red; }")
+    (directory / "module.pyc").write_bytes(b"compiled")
+    (directory / "__pycache__").mkdir()
+    (directory / "__pycache__" / "module.cpython-38.pyc").write_bytes(b"compiled")
+    assert get_dir_hash(directory) == initial_hash
+
+    # Moving a file to a different directory changes the hash
+    nested_file.rename(directory / "my-theme" / "main.scss")
+    assert get_dir_hash(directory) != initial_hash
+
+
+def test_get_dir_hash_deterministic(tmp_path):
+    directory = tmp_path / "requirements"
+    for i in range(20):
+        subdirectory = directory / f"package_{i % 4}"
+        subdirectory.mkdir(parents=True, exist_ok=True)
+        (subdirectory / f"file_{i}.txt").write_text(str(i))
+
+    expected_hash = get_dir_hash(directory, max_workers=1)
+    for max_workers in (2, 8, None):
+        assert get_dir_hash(directory, max_workers=max_workers) == expected_hash
+
+
+def test_get_dir_hash_symlinks(tmp_path):
+    directory = tmp_path / "requirements"
+    package = tmp_path / "package"
+    package.mkdir()
+    directory.mkdir()
+    (package / "setup.py").write_text("from setuptools import setup")
+    (directory / "package").symlink_to(package)
+    # A symlink loop should not make us loop forever
+    (package / "loop").symlink_to(directory)
+    initial_hash = get_dir_hash(directory)
+
+    # The contents of symlinked directories are taken into account
+    (package / "setup.py").write_text("from setuptools import setup\nsetup()")
+    assert get_dir_hash(directory) != initial_hash
+
+
+def test_get_dir_hash_shared_symlinks(tmp_path):
+    directory = tmp_path / "themes"
+    static = tmp_path / "static"
+    static.mkdir()
+    (static / "main.css").write_text("body { color: red; }")
+    for theme in ("one", "two"):
+        (directory / theme).mkdir(parents=True)
+        (directory / theme / "static").symlink_to(static)
+
+    # A directory reached through two symlinks is hashed under both paths
+    files = sorted(relative_path for relative_path, *_ in iter_dir_files(directory))
+    assert files == ["one/static/main.css", "two/static/main.css"]
+
+
+def test_get_file_hash(tmp_path, mocker):
+    content = os.urandom(4096)
+    file_path = tmp_path / "big.tar"
+    file_path.write_bytes(content)
+    expected = hashlib.sha256(content).hexdigest()
+    assert get_file_hash(file_path) == expected
+
+    # Files above the threshold are hashed through mmap
+    mocker.patch("derex.runner.hashing.MMAP_THRESHOLD", new=1024)
+    mmap_spy = mocker.spy(derex.runner.hashing.mmap, "mmap")
+    assert get_file_hash(file_path) == expected
+    mmap_spy.assert_called_once()
+
+
+@pytest.mark.slowtest
+def test_hash_index_benchmark(tmp_path):
+    """Compare cold and warm hashing of a synthetic 50k files tree."""
+    directory = tmp_path / "themes"
+    for i in range(50000):
+        subdirectory = directory / f"theme_{i % 50}" / f"static_{i % 20}"
+        subdirectory.mkdir(parents=True, exist_ok=True)
+        (subdirectory / f"file_{i}.css").write_bytes(os.urandom(512))
+    index_path = tmp_path / "hash_index.json"
+
+    start = time.perf_counter()
+    index = HashIndex(index_path)
+    cold_hash = index.get_dir_hash(directory)
+    index.save()
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    warm_hash = HashIndex(index_path).get_dir_hash(directory)
+    warm = time.perf_counter() - start
+
+    print(f"Hashing 50k files: cold {cold:.3f}s, warm {warm:.3f}s")
+    assert cold_hash == warm_hash
+    assert warm < cold
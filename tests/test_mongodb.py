@@ -21,10 +21,12 @@ def start_mongodb(sys_argv):
 @pytest.fixture(autouse=True)
 def cleanup_mongodb(start_mongodb):
     """Ensure no test database is left behind"""
-    from derex.runner.mongodb import MONGODB_CLIENT
+    from derex.runner.mongodb import get_mongodb_client
 
     yield
 
+    MONGODB_CLIENT = get_mongodb_client()
+
     for database_name in [
         database["name"]
         for database in MONGODB_CLIENT.list_databases()
@@ -40,12 +42,10 @@ def cleanup_mongodb(start_mongodb):
 def test_derex_mongodb(start_mongodb):
     from derex.runner.cli.mongodb import copy_mongodb
     from derex.runner.cli.mongodb import drop_mongodb
+    from derex.runner.mongodb import get_mongodb_client
     from derex.runner.mongodb import list_databases
 
-    import derex.runner.mongodb
-
-    reload(derex.runner.mongodb)
-    MONGODB_CLIENT = derex.runner.mongodb.MONGODB_CLIENT
+    MONGODB_CLIENT = get_mongodb_client()
 
     test_db_name = f"derex_test_db_{uuid.uuid4().hex[:20]}"
     test_db_copy_name = f"derex_test_db_copy_{uuid.uuid4().hex[:20]}"
@@ -85,3 +85,176 @@ def test_derex_mongodb_reset_password(mocker, start_mongodb):
     # If the password is still not resetted to the value of the derex generated password
     # but still set to "secret" the next test will fail
     assert_result_ok(runner.invoke(shell))
+
+
+@pytest.fixture
+def mongodb_client_class(mocker):
+    """Reload the mongodb module with a mocked docker client and MongoClient class."""
+    import derex.runner.mongodb
+
+    wait_for_service = mocker.patch("derex.runner.docker_utils.wait_for_service")
+    mocker.patch("derex.runner.docker_utils.client")
+    client_class = mocker.patch("pymongo.MongoClient")
+    reload(derex.runner.mongodb)
+
+    yield client_class, wait_for_service
+
+    mocker.stopall()
+    reload(derex.runner.mongodb)
+
+
+def test_mongodb_client_is_lazy(mongodb_client_class):
+    from derex.runner.mongodb import get_mongodb_client
+    from derex.runner.mongodb import list_databases
+    from derex.runner.mongodb import list_users
+
+    client_class, wait_for_service = mongodb_client_class
+    # Importing the module does not connect to the database
+    wait_for_service.assert_not_called()
+    client_class.assert_not_called()
+
+    list_databases()
+    list_users()
+    # The client is created once, checked with a ping, and then reused
+    client_class.assert_called_once()
+    assert client_class.call_args.kwargs["connectTimeoutMS"] == 5000
+    client_class.return_value.admin.command.assert_any_call("ping")
+    assert get_mongodb_client() is client_class.return_value
+
+    # Each service gets a client of its own
+    get_mongodb_client("mongodb4")
+    assert client_class.call_count == 2
+    wait_for_service.assert_called_with("mongodb4")
+
+
+def test_mongodb_client_health_check(mongodb_client_class):
+    from derex.runner.mongodb import get_mongodb_client
+    from pymongo.errors import ServerSelectionTimeoutError
+
+    import derex.runner.mongodb
+
+    client_class, _ = mongodb_client_class
+    client_class.return_value.admin.command.side_effect = ServerSelectionTimeoutError
+    with pytest.raises(RuntimeError):
+        get_mongodb_client()
+    client_class.return_value.close.assert_called_once()
+    assert derex.runner.mongodb.MONGODB_CLIENT is None
+
+
+def test_mongodb_reset_password_without_client(mongodb_client_class, mocker):
+    from derex.runner.mongodb import execute_root_shell
+    from derex.runner.mongodb import reset_mongodb_password
+    from pymongo.errors import OperationFailure
+
+    client_class, wait_for_service = mongodb_client_class
+    # Authentication with the derived password fails
+    client_class.return_value.admin.command.side_effect = OperationFailure("auth")
+    run_ddc_services = mocker.patch("derex.runner.mongodb.run_ddc_services")
+
+    reset_mongodb_password("secret")
+    execute_root_shell("db.version()")
+    assert run_ddc_services.call_count == 2
+    wait_for_service.assert_called_with("mongodb")
+    client_class.assert_not_called()
+
+
+class FakeCollection:
+    """A minimal in-memory stand-in for a pymongo collection."""
+
+    def __init__(self, documents=(), indexes=()):
+        self.documents = list(documents)
+        self.indexes = list(indexes)
+        self.inserted_batches = []
+        self.created_indexes = []
+
+    def with_options(self, codec_options):
+        self.codec_options = codec_options
+        return self
+
+    def find(self, filter, batch_size):
+        from bson import encode
+
+        for document in self.documents:
+            yield self.codec_options.document_class(encode(document))
+
+    def insert_many(self, documents, ordered, bypass_document_validation):
+        assert ordered is False
+        self.inserted_batches.append(list(documents))
+
+    def list_indexes(self):
+        return iter(self.indexes)
+
+    def create_indexes(self, indexes):
+        self.created_indexes.extend(indexes)
+
+
+def test_copy_collection():
+    from bson import decode
+    from derex.runner.mongodb import copy_collection
+    from derex.runner.mongodb import copy_indexes
+
+    documents = [{"_id": i, "data": b"x" * 1000} for i in range(10)]
+    source = FakeCollection(
+        documents,
+        indexes=[
+            {"v": 2, "key": {"_id": 1}, "name": "_id_"},
+            {"v": 2, "key": {"files_id": 1, "n": 1}, "name": "chunks", "unique": True},
+        ],
+    )
+    destination = FakeCollection()
+
+    stats = copy_collection(source, destination, batch_bytes=4096)
+    assert stats["documents"] == 10
+    # Documents are inserted in batches of about 4096 bytes, without decoding them
+    assert [len(batch) for batch in destination.inserted_batches] == [4, 4, 2]
+    copied = [
+        decode(doc.raw) for batch in destination.inserted_batches for doc in batch
+    ]
+    assert copied == documents
+    assert stats["bytes"] == sum(
+        len(doc.raw) for batch in destination.inserted_batches for doc in batch
+    )
+
+    copy_indexes(source, destination)
+    assert [index.document for index in destination.created_indexes] == [
+        {"key": {"files_id": 1, "n": 1}, "name": "chunks", "unique": True}
+    ]
+
+
+def test_copy_database(mongodb_client_class, mocker):
+    from derex.runner.mongodb import copy_database
+
+    client_class, _ = mongodb_client_class
+    source = FakeCollection(
+        [{"_id": i} for i in range(3)],
+        indexes=[{"v": 2, "key": {"_id": 1}, "name": "_id_"}],
+    )
+    destination = FakeCollection()
+    source_db = mocker.MagicMock()
+    source_db.list_collections.return_value = [
+        {"name": "modulestore", "type": "collection", "options": {}},
+        {"name": "system.profile", "type": "collection", "options": {}},
+        {"name": "recent", "type": "view", "options": {}},
+    ]
+    source_db.command.return_value = {"size": 100}
+    source_db.__getitem__.side_effect = {"modulestore": source}.__getitem__
+    destination_db = mocker.MagicMock()
+    destination_db.list_collection_names.return_value = []
+    destination_db.create_collection.return_value = destination
+    destination_db.__getitem__.return_value = destination
+    client = mocker.MagicMock()
+    client.__getitem__.side_effect = {
+        "edxapp": source_db,
+        "edxapp_copy": destination_db,
+    }.__getitem__
+
+    # The given client is used instead of the one of the "mongodb" service
+    stats = copy_database("edxapp", "edxapp_copy", max_workers=1, client=client)
+    client_class.assert_not_called()
+    assert list(stats) == ["modulestore"]
+    assert stats["modulestore"]["documents"] == 3
+    destination_db.create_collection.assert_called_once_with("modulestore")
+
+    destination_db.list_collection_names.return_value = ["modulestore"]
+    with pytest.raises(RuntimeError):
+        copy_database("edxapp", "edxapp_copy", client=client)
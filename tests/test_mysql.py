@@ -1,12 +1,17 @@
 from .conftest import assert_result_ok
 from .conftest import DEREX_TEST_USER
 from click.testing import CliRunner
+from derex.runner.mysql import close_connection_pools
 from derex.runner.mysql import get_system_mysql_client
+from derex.runner.mysql import MySQLConnectionPool
 from derex.runner.mysql import show_databases
+from derex.runner.mysql import wait_for_mysql
 from itertools import repeat
+from pathlib import Path
 from types import SimpleNamespace
 
 import pytest
+import sys
 import uuid
 
 
@@ -118,3 +123,566 @@ def test_derex_mysql_reset_password(start_mysql, mocker):
 
     # Now this should be
     assert_result_ok(result=runner.invoke(shell, ["SHOW DATABASES;"]))
+
+
+@pytest.fixture
+def pymysql_connect(mocker):
+    """Mock `pymysql.connect` to return a new mocked connection on every call."""
+    close_connection_pools()
+    wait_for_mysql.cache_clear()
+    connect = mocker.patch(
+        "pymysql.connect", side_effect=lambda **kwargs: mocker.MagicMock(open=True)
+    )
+    yield connect
+    close_connection_pools()
+    wait_for_mysql.cache_clear()
+
+
+def test_mysql_connection_pool(pymysql_connect):
+    pool = MySQLConnectionPool(size=1, host="mysql")
+    with pool.cursor() as cursor:
+        cursor.execute("SELECT 1;")
+    with pool.cursor() as cursor:
+        cursor.execute("SELECT 1;")
+    pymysql_connect.assert_called_once_with(host="mysql")
+
+    # Connections exceeding the pool size are closed when released
+    with pool.connection() as first, pool.connection() as second:
+        assert first is not second
+    assert pymysql_connect.call_count == 2
+    second.close.assert_not_called()
+    first.close.assert_called_once()
+
+    # Connections that raised an error are not reused
+    with pytest.raises(ValueError):
+        with pool.connection() as connection:
+            raise ValueError
+    connection.close.assert_called_once()
+    with pool.connection() as new_connection:
+        assert new_connection is not connection
+
+
+def test_mysql_helpers_reuse_connection(pymysql_connect, mocker):
+    from derex.runner.mysql import create_database
+    from derex.runner.mysql import create_user
+    from derex.runner.mysql import drop_database
+
+    wait_for_service = mocker.patch("derex.runner.mysql.wait_for_service")
+    docker_client = mocker.patch("derex.runner.mysql.docker_client")
+
+    for i in range(10):
+        create_database(f"derex_test_db_{i}")
+        create_user(f"{DEREX_TEST_USER}_{i}", "secret", "%")
+        drop_database(f"derex_test_db_{i}")
+
+    wait_for_service.assert_called_once()
+    docker_client.containers.get.assert_called_once_with("mysql")
+    pymysql_connect.assert_called_once()
+
+
+@pytest.mark.parametrize("databases_count", [1, 10, 200])
+def test_show_databases_round_trips(pymysql_connect, mocker, databases_count):
+    mocker.patch("derex.runner.mysql.wait_for_service")
+    mocker.patch("derex.runner.mysql.docker_client")
+    connection = mocker.MagicMock(open=True)
+    pymysql_connect.side_effect = None
+    pymysql_connect.return_value = connection
+    cursor = connection.cursor.return_value.__enter__.return_value
+
+    # Only databases with an even index have an auth_user table
+    schemas = tuple(
+        (f"derex_test_db_{i}", i, int(i % 2 == 0), 1024 * i, 512 * i)
+        for i in range(databases_count)
+    )
+    users_counts = tuple(
+        (name, 7) for name, _, has_auth_user, *_ in schemas if has_auth_user
+    )
+    cursor.fetchall.side_effect = [schemas, users_counts]
+
+    databases = show_databases(sizes=True)
+
+    assert cursor.execute.call_count == 2
+    assert databases[0] == ("derex_test_db_0", 0, 7, 0, 0)
+    assert databases[-1][:3] == (
+        f"derex_test_db_{databases_count - 1}",
+        databases_count - 1,
+        7 if databases_count % 2 else 0,
+    )
+    assert len(databases) == databases_count
+
+
+def test_get_django_users_counts_percent(mocker):
+    from derex.runner.mysql import get_django_users_counts
+
+    def execute(query, args=None):
+        # Like pymysql, only format the query when arguments are given
+        if args is not None:
+            query % tuple(args)
+
+    cursor = mocker.MagicMock()
+    cursor.execute.side_effect = execute
+    cursor.fetchall.return_value = (("derex_100%", 3), ("derex_db", 5))
+
+    counts = get_django_users_counts(cursor, ["derex_100%", "derex_db"])
+    assert counts == {"derex_100%": 3, "derex_db": 5}
+    assert "`derex_100%%`.auth_user" in cursor.execute.call_args[0][0]
+
+
+SHOW_CREATE_TABLE = """CREATE TABLE `courseware_studentmodule` (
+  `id` int(11) NOT NULL AUTO_INCREMENT,
+  `module_type` varchar(32) NOT NULL,
+  `student_id` int(11) NOT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `courseware_studentmodule_student_id` (`student_id`,`module_type`),
+  KEY `courseware_studentmodule_module_type` (`module_type`),
+  CONSTRAINT `courseware_student_id_fk` FOREIGN KEY (`student_id`) REFERENCES `auth_user` (`id`)
+) ENGINE=InnoDB AUTO_INCREMENT=42 DEFAULT CHARSET=utf8"""
+
+
+def test_split_table_definition():
+    from derex.runner.mysql import split_table_definition
+
+    create_statement, indexes, constraints = split_table_definition(SHOW_CREATE_TABLE)
+    assert create_statement == (
+        "CREATE TABLE `courseware_studentmodule` (\n"
+        "  `id` int(11) NOT NULL AUTO_INCREMENT,\n"
+        "  `module_type` varchar(32) NOT NULL,\n"
+        "  `student_id` int(11) NOT NULL,\n"
+        "  PRIMARY KEY (`id`)\n"
+        ") ENGINE=InnoDB AUTO_INCREMENT=42 DEFAULT CHARSET=utf8"
+    )
+    assert indexes == [
+        "UNIQUE KEY `courseware_studentmodule_student_id` (`student_id`,`module_type`)",
+        "KEY `courseware_studentmodule_module_type` (`module_type`)",
+    ]
+    assert constraints == [
+        "CONSTRAINT `courseware_student_id_fk` FOREIGN KEY (`student_id`) "
+        "REFERENCES `auth_user` (`id`)"
+    ]
+
+
+def test_split_table_definition_auto_increment_key():
+    from derex.runner.mysql import split_table_definition
+
+    create_statement, indexes, _ = split_table_definition(
+        "CREATE TABLE `history` (\n"
+        "  `course_id` varchar(255) NOT NULL,\n"
+        "  `id` int(11) NOT NULL AUTO_INCREMENT,\n"
+        "  `created` datetime NOT NULL,\n"
+        "  PRIMARY KEY (`course_id`,`id`),\n"
+        "  KEY `history_created` (`created`),\n"
+        "  KEY `history_id` (`id`)\n"
+        ") ENGINE=InnoDB DEFAULT CHARSET=utf8"
+    )
+    # The AUTO_INCREMENT column needs an index starting with it
+    assert "  KEY `history_id` (`id`)\n) ENGINE" in create_statement
+    assert indexes == ["KEY `history_created` (`created`)"]
+
+
+class FakeCopyCursor:
+    """A cursor answering the queries run by `copy_database`, for a source
+    database with the given tables and `SHOW CREATE TABLE` statements.
+    """
+
+    def __init__(self, tables, definitions, keys, source_exists=True):
+        self.tables = tables
+        self.definitions = definitions
+        self.keys = keys
+        self.source_exists = source_exists
+        self.statements = []
+        self.rowcount = 0
+        self._result = None
+
+    def execute(self, query, args=None):
+        if args is not None:
+            # Like pymysql, only format the query when arguments are given
+            query % tuple("?" for _ in args)
+        self.statements.append((query, args))
+        if "information_schema.SCHEMATA" in query:
+            self._result = [(args[0],)] if self.source_exists else []
+        elif "information_schema.TABLES" in query:
+            self._result = self.tables
+        elif query.startswith("SHOW CREATE TABLE"):
+            table = query.split(".")[-1].strip("`")
+            self._result = [(table, self.definitions[table])]
+        elif query.startswith("SELECT"):
+            # Find the last key of a chunk
+            table = query.split(" FROM ")[1].split()[0].split(".")[-1].strip("`")
+            offset = int(query.rsplit(" ", 1)[-1])
+            keys = [key for key in self.keys[table] if not args or key > args[0]]
+            self._result = [(keys[offset],)] if offset < len(keys) else []
+        elif query.startswith("INSERT"):
+            table = query.split(" FROM ")[1].split()[0].split(".")[-1].strip("`")
+            self.rowcount = len(self.keys.get(table, [None]))
+            if args:
+                low = args[0] if "> %s" in query else float("-inf")
+                high = args[-1] if "<= %s" in query else float("inf")
+                self.rowcount = len(
+                    [key for key in self.keys[table] if low < key <= high]
+                )
+
+    def fetchall(self):
+        return self._result
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+def test_copy_database(pymysql_connect, mocker):
+    from derex.runner.mysql import copy_database
+
+    mocker.patch("derex.runner.mysql.wait_for_service")
+    mocker.patch("derex.runner.mysql.docker_client")
+    connection = mocker.MagicMock(open=True)
+    pymysql_connect.side_effect = None
+    pymysql_connect.return_value = connection
+    cursor = FakeCopyCursor(
+        tables=(
+            ("auth_user", "BASE TABLE", 1000),
+            ("courseware_studentmodule", "BASE TABLE", 5000),
+            ("active_users", "VIEW", None),
+        ),
+        definitions={
+            "auth_user": "CREATE TABLE `auth_user` (\n  `id` int(11)\n) ENGINE=InnoDB",
+            "courseware_studentmodule": SHOW_CREATE_TABLE,
+        },
+        keys={"courseware_studentmodule": [1, 2, 5, 8, 9]},
+    )
+    connection.cursor.return_value = cursor
+
+    stats = copy_database("edxapp", "edxapp_copy", max_workers=1, chunk_rows=2)
+
+    assert set(stats) == {"auth_user", "courseware_studentmodule"}
+    assert stats["courseware_studentmodule"]["rows"] == 5
+    assert stats["courseware_studentmodule"]["bytes"] == 5000
+    connect_kwargs = pymysql_connect.call_args_list[-1].kwargs
+    assert connect_kwargs["db"] == "edxapp_copy"
+    assert "foreign_key_checks = 0" in connect_kwargs["init_command"]
+
+    statements = [query for query, _ in cursor.statements]
+    lock = statements.index(
+        "FLUSH TABLES `edxapp`.`auth_user`, `edxapp`.`courseware_studentmodule` "
+        "WITH READ LOCK"
+    )
+    unlock = statements.index("UNLOCK TABLES")
+    inserts = [
+        i for i, statement in enumerate(statements) if statement.startswith("INSERT")
+    ]
+    alters = [
+        i for i, statement in enumerate(statements) if statement.startswith("ALTER")
+    ]
+    # Rows are copied while the source is locked, indexes are added afterwards
+    assert lock < min(inserts) and max(inserts) < unlock
+    assert len(alters) == 2 and unlock < min(alters)
+    assert statements[alters[0]].startswith(
+        "ALTER TABLE `courseware_studentmodule` ADD UNIQUE KEY"
+    )
+    assert "ADD CONSTRAINT `courseware_student_id_fk`" in statements[alters[1]]
+    # Tables with a primary key are copied in chunks of primary key ranges
+    assert [
+        args
+        for query, args in cursor.statements
+        if query.startswith("INSERT INTO `courseware_studentmodule`")
+    ] == [(2,), (2, 8), (8,)]
+    assert ("INSERT INTO `auth_user` SELECT * FROM `edxapp`.`auth_user`", ()) in (
+        cursor.statements
+    )
+
+    # Copying a database that does not exist fails
+    cursor.source_exists = False
+    with pytest.raises(RuntimeError):
+        copy_database("missing", "edxapp_copy")
+
+
+def test_reset_mysql_openedx_snapshot(pymysql_connect, mocker, tmp_path):
+    from derex.runner.mysql import get_reset_snapshot_name
+    from derex.runner.mysql import reset_mysql_openedx
+
+    wait_for_service = mocker.patch("derex.runner.mysql.wait_for_service")
+    image_index = mocker.patch("derex.runner.mysql.image_index")
+    image_index.get.return_value = {"Id": "sha256:lilac"}
+    run_ddc_project = mocker.patch("derex.runner.mysql.run_ddc_project")
+    copy_database = mocker.patch("derex.runner.mysql.copy_database")
+    drop_database = mocker.patch("derex.runner.mysql.drop_database")
+    database_exists = mocker.patch("derex.runner.mysql.database_exists")
+    list_databases = mocker.patch("derex.runner.mysql.list_databases_with_prefix")
+    fixtures_dir = tmp_path / "fixtures"
+    (fixtures_dir / "lms").mkdir(parents=True)
+    (fixtures_dir / "lms" / "users.json").write_text("[]")
+    project = SimpleNamespace(
+        name="project",
+        mysql_db_name="project_openedx",
+        mysql_service="mysql57",
+        docker_image_name="derex/openedx-lilac",
+        fixtures_dir=fixtures_dir,
+    )
+    snapshot = get_reset_snapshot_name(project)
+
+    # The first reset loads the dump and fixtures, and saves a snapshot
+    # on the mysql service of the project
+    stale_snapshot = snapshot[:-16] + "0" * 16
+    list_databases.side_effect = [[], [stale_snapshot]]
+    reset_mysql_openedx(project)
+    wait_for_service.assert_called_with("mysql57")
+    run_ddc_project.assert_called_once()
+    database_exists.assert_called_once_with("project_openedx", "mysql57")
+    list_databases.assert_called_with(snapshot[:-16], "mysql57")
+    drop_database.assert_called_once_with(stale_snapshot, "mysql57")
+    copy_database.assert_called_once_with(
+        "project_openedx", snapshot, service="mysql57"
+    )
+
+    # The following ones copy the snapshot, and only load changed fixtures
+    run_ddc_project.reset_mock()
+    copy_database.reset_mock()
+    drop_database.reset_mock()
+    list_databases.side_effect = [[snapshot]]
+    reset_mysql_openedx(project)
+    run_ddc_project.assert_called_once()
+    assert run_ddc_project.call_args[0][0][-1] == "--fixtures-only"
+    drop_database.assert_called_once_with("project_openedx", "mysql57")
+    copy_database.assert_called_once_with(
+        snapshot, "project_openedx", service="mysql57"
+    )
+
+    # No snapshot is saved if the reset did not create the database
+    run_ddc_project.reset_mock()
+    copy_database.reset_mock()
+    drop_database.reset_mock()
+    list_databases.side_effect = [[]]
+    database_exists.return_value = False
+    with pytest.raises(RuntimeError):
+        reset_mysql_openedx(project)
+    run_ddc_project.assert_called_once()
+    copy_database.assert_not_called()
+    drop_database.assert_not_called()
+
+    # Changing fixtures does not invalidate the snapshot, changing image does
+    (fixtures_dir / "lms" / "users.json").write_text('[{"model": "auth.user"}]')
+    assert get_reset_snapshot_name(project) == snapshot
+    image_index.get.return_value = {"Id": "sha256:koa"}
+    assert get_reset_snapshot_name(project) != snapshot
+    image_index.get.return_value = None
+    assert get_reset_snapshot_name(project) is None
+
+
+@pytest.fixture
+def restore_dump(mocker, tmp_path):
+    """Load the restore_dump.py script, which only runs inside Open edX
+    containers, with its container-only dependencies mocked.
+    """
+    import importlib.machinery
+    import importlib.util
+
+    management = mocker.MagicMock()
+    mocker.patch.dict(
+        sys.modules,
+        {
+            "django": mocker.MagicMock(),
+            "django.conf": mocker.MagicMock(),
+            "django.core": mocker.MagicMock(management=management),
+            "django.core.management": management,
+            "MySQLdb": mocker.MagicMock(),
+        },
+    )
+    loader = importlib.machinery.SourceFileLoader(
+        "restore_dump",
+        str(Path(__file__).parent.parent / "derex/runner/restore_dump.py.source"),
+    )
+    spec = importlib.util.spec_from_loader("restore_dump", loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    module.DUMP_FILE_PATH = str(tmp_path / "empty_dump.sql.bz2")
+    module.FIXTURES_DIR = str(tmp_path / "fixtures")
+    module.EDX_PLATFORM_DIR = str(tmp_path)
+    return module
+
+
+DUMP_SQL = """-- MySQL dump
+/*!40101 SET @OLD_CHARACTER_SET_CLIENT=@@CHARACTER_SET_CLIENT */;
+DROP TABLE IF EXISTS `semi;colon`;
+CREATE TABLE `semi;colon` (
+  `id` int(11) NOT NULL,
+  `text` longtext /* a comment; with a semicolon */
+);
+# Another comment;
+INSERT INTO `semi;colon` VALUES (1,'it''s; here'),(2,'escaped \\'; quote'),(3,"double; \\"quoted\\"");
+INSERT INTO `semi;colon` VALUES (4,'multi
+line;
+string');
+-- Dump completed
+"""
+
+
+def test_restore_dump_splitter(restore_dump):
+    batches = list(restore_dump.iter_dump_batches(DUMP_SQL.splitlines(True), 1))
+    statements = [text for text, _ in batches]
+    assert [count for _, count in batches] == [1, 1, 1, 1, 1]
+    assert statements[0].startswith("-- MySQL dump\n/*!40101")
+    assert statements[2].endswith("a semicolon */\n);")
+    assert statements[3].endswith('(3,"double; \\"quoted\\"");')
+    assert statements[
+        4
+    ] == "\nINSERT INTO `semi;colon` VALUES (4,'multi\nline;\nstring');" + (
+        "\n-- Dump completed\n"
+    )
+    assert "".join(statements) == DUMP_SQL
+
+    # Statements are grouped in batches of about the requested size
+    batches = list(restore_dump.iter_dump_batches(DUMP_SQL.splitlines(True), 150))
+    assert [count for _, count in batches] == [3, 2]
+    assert "".join(text for text, _ in batches) == DUMP_SQL
+
+
+def test_restore_dump_streaming(restore_dump, mocker):
+    import bz2
+
+    with bz2.BZ2File(restore_dump.DUMP_FILE_PATH, "w") as fh:
+        fh.write(DUMP_SQL.encode("utf-8"))
+    connection = restore_dump.MySQLdb.connect.return_value
+    cursor = connection.cursor.return_value
+    cursor.rowcount = 2
+    cursor.nextset.side_effect = lambda: False
+
+    restore_dump.restore_dump()
+
+    executed = [call.args[0] for call in cursor.execute.call_args_list]
+    assert executed[2] == "SET foreign_key_checks = 0, unique_checks = 0"
+    assert executed[-1] == "SET foreign_key_checks = 1, unique_checks = 1"
+    assert "".join(executed[3:-1]) == DUMP_SQL
+    connection.autocommit.assert_called_once_with(False)
+    connection.commit.assert_called_once()
+
+
+def test_restore_dump_fixtures(restore_dump, mocker, tmp_path):
+    fixtures_dir = tmp_path / "fixtures"
+    (fixtures_dir / "cms").mkdir(parents=True)
+    (fixtures_dir / "lms").mkdir()
+    (fixtures_dir / "cms" / "courses.json").write_text("[]")
+    (fixtures_dir / "lms" / "01_users.json").write_text("[]")
+    (fixtures_dir / "lms" / "02_profiles.json").write_text("[]")
+    fixtures = restore_dump.list_fixtures()
+    assert [name for name, _, _ in fixtures] == [
+        "cms/courses.json",
+        "lms/01_users.json",
+        "lms/02_profiles.json",
+    ]
+    digests = {name: digest for name, _, digest in fixtures}
+
+    get_connection = mocker.patch.object(restore_dump, "get_connection")
+    cursor = get_connection.return_value.cursor.return_value
+    check_call = mocker.patch.object(restore_dump.subprocess, "check_call")
+
+    # Only fixtures whose digest changed are loaded, in a process for their variant
+    (fixtures_dir / "lms" / "02_profiles.json").write_text('[{"model": "x"}]')
+    cursor.fetchall.return_value = list(digests.items()) + [("lms/old.json", "0")]
+    restore_dump.run_fixtures()
+    check_call.assert_called_once()
+    args, kwargs = check_call.call_args
+    assert args[0][2:] == [
+        "--load-fixtures",
+        "lms",
+        str(fixtures_dir / "lms" / "02_profiles.json"),
+    ]
+    assert kwargs["env"]["SERVICE_VARIANT"] == "lms"
+    replace_args = cursor.execute.call_args_list[-1][0]
+    assert replace_args[0].startswith("REPLACE INTO `derex_fixtures`")
+    assert replace_args[1] == (
+        "lms/02_profiles.json",
+        restore_dump.get_fixture_digest(fixtures_dir / "lms" / "02_profiles.json"),
+    )
+
+    # When loading fails no digest is recorded
+    check_call.reset_mock()
+    cursor.execute.reset_mock()
+    check_call.side_effect = restore_dump.subprocess.CalledProcessError(1, "python")
+    with pytest.raises(restore_dump.subprocess.CalledProcessError):
+        restore_dump.run_fixtures()
+    assert not any(
+        args[0].startswith("REPLACE") for args, _ in cursor.execute.call_args_list
+    )
+    check_call.side_effect = None
+
+    # When all fixtures are up to date no process is started
+    check_call.reset_mock()
+    cursor.fetchall.return_value = [
+        (name, digest) for name, _, digest in restore_dump.list_fixtures()
+    ]
+    restore_dump.run_fixtures()
+    check_call.assert_not_called()
+
+
+def test_restore_dump_load_variant_fixtures(restore_dump, monkeypatch, tmp_path):
+    import json
+
+    # Running manage.py changes the working directory and sys.argv
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "argv", list(sys.argv))
+    (tmp_path / "manage.py").write_text(
+        "import sys\n"
+        "from django.core.management import execute_from_command_line\n"
+        "open('started_variant', 'w').write(sys.argv[1])\n"
+        "execute_from_command_line(sys.argv)\n"
+    )
+    # The profile in the first file references the user in the second one
+    profiles = tmp_path / "01_profiles.json"
+    profiles.write_text(
+        json.dumps([{"model": "auth.userprofile", "pk": 1, "fields": {"user": 5}}])
+    )
+    users = tmp_path / "02_users.json"
+    users.write_text(json.dumps([{"model": "auth.user", "pk": 5, "fields": {}}]))
+
+    def loaddata(command, *filepaths):
+        # Like django, only resolve references at the end of a single loaddata
+        objects = [obj for path in filepaths for obj in json.loads(open(path).read())]
+        users = {obj["pk"] for obj in objects if obj["model"] == "auth.user"}
+        for obj in objects:
+            if "user" in obj["fields"] and obj["fields"]["user"] not in users:
+                raise Exception("IntegrityError")
+
+    management = sys.modules["django.core.management"]
+    management.call_command.side_effect = loaddata
+
+    restore_dump.load_variant_fixtures("cms", [str(profiles), str(users)])
+    assert (tmp_path / "started_variant").read_text() == "cms"
+    management.call_command.assert_called_once_with(
+        "loaddata", str(profiles), str(users)
+    )
+
+
+@pytest.mark.slowtest
+def test_restore_dump_bounded_memory(restore_dump):
+    """Splitting a 32MB dump should not need memory proportional to its size."""
+    import bz2
+    import time
+    import tracemalloc
+
+    row = "(1,'{}')".format("x" * 1000)
+    statement = "INSERT INTO `table` VALUES {};\n".format(",".join([row] * 32))
+    with bz2.BZ2File(restore_dump.DUMP_FILE_PATH, "w") as fh:
+        for _ in range(1024):
+            fh.write(statement.encode("utf-8"))
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        statements = sum(
+            count
+            for _, count in restore_dump.iter_dump_batches(
+                restore_dump.iter_dump_lines()
+            )
+        )
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    elapsed = time.perf_counter() - start
+
+    print(f"Split 32MB dump in {elapsed:.2f}s, peak memory {peak / 1e6:.1f}MB")
+    assert statements == 1024
+    assert peak < 8 * restore_dump.BATCH_SIZE
@@ -2,6 +2,8 @@ from itertools import permutations
 
 import logging
 import pytest
+import random
+import time
 
 
 def test_registry_exception():
@@ -78,6 +80,67 @@ def test_registry_add_list_impossible():
         registry.add_list(to_add)
 
 
+def test_registry_index_for_name():
+    from derex.runner.plugins import Registry
+
+    registry = Registry()
+    for name, priority in [("a", 10), ("b", 20), ("c", 10), ("d", 10), ("e", 5)]:
+        registry.register(name.upper(), name, priority)
+    # Items with the same priority keep their registration order
+    assert list(registry) == ["B", "A", "C", "D", "E"]
+    assert [registry.get_index_for_name(name) for name in "abcde"] == [1, 0, 2, 3, 4]
+
+    registry.register("C", "c", 30)
+    assert list(registry) == ["C", "B", "A", "D", "E"]
+    registry.deregister("a")
+    assert registry.get_index_for_name("d") == 2
+    assert list(registry[1:]) == ["B", "D", "E"]
+
+
+def test_sort_items_cache():
+    from derex.runner.plugins import resolve_order
+    from derex.runner.plugins import sort_items
+
+    resolve_order.cache_clear()
+    plugins = [
+        {"name": "local", "priority": "_end", "options": ["-f", "local.yml"]},
+        {"name": "base", "priority": "_begin", "options": ["-f", "base.yml"]},
+    ]
+    assert sort_items(plugins, "options") == ["-f", "base.yml", "-f", "local.yml"]
+    plugins[0]["options"] = ["-f", "other.yml"]
+    assert sort_items(plugins, "options") == ["-f", "base.yml", "-f", "other.yml"]
+    assert resolve_order.cache_info().hits == 1
+
+
+@pytest.mark.slowtest
+def test_sort_items_benchmark():
+    """Resolve the order of 3000 synthetic plugins, cold and cached."""
+    from derex.runner.plugins import resolve_order
+    from derex.runner.plugins import sort_items
+
+    plugins = []
+    for i in range(3000):
+        if i % 3 == 0:
+            priority = random.choice(["_begin", "_end"])
+        else:
+            priority = random.choice("<>") + plugins[random.randrange(i)]["name"]
+        plugins.append({"name": f"plugin-{i}", "priority": priority, "options": [i]})
+    resolve_order.cache_clear()
+
+    start = time.perf_counter()
+    cold_options = sort_items(plugins, "options")
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cached_options = sort_items(plugins, "options")
+    cached = time.perf_counter() - start
+
+    print(f"Sorting 3000 plugins: cold {cold:.3f}s, cached {cached:.3f}s")
+    assert sorted(cold_options) == list(range(3000))
+    assert cached_options == cold_options
+    assert cached < cold
+
+
 def test_plugin_sorting_and_validation(caplog):
     from derex.runner.plugins import sort_and_validate_plugins
 
@@ -118,3 +181,55 @@ def test_plugin_sorting_and_validation(caplog):
     assert caplog.text.count("Plugins 'options' field must be a list.") == 2
 
     assert plugins == ["this", "list", "should", "contain", "only", "valid", "plugins"]
+
+
+def test_hook_profiler(minimal_project):
+    from derex.runner import hookimpl
+    from derex.runner.plugins import hook_profiler
+    from derex.runner.plugins import setup_plugin_manager
+    from derex.runner.plugins import time_hook_implementations
+    from derex.runner.project import Project
+
+    class GreedyProject:
+        @staticmethod
+        @hookimpl
+        def ddc_project_options(project):
+            """See derex.runner.plugin_spec.ddc_project_options docstring"""
+            ballast = bytearray(1024 * 1024)
+            return {
+                "options": [str(len(ballast))],
+                "name": "greedy",
+                "priority": "_end",
+            }
+
+    plugin_manager = setup_plugin_manager()
+    plugin_manager.register(GreedyProject)
+    # Plugins registered after setup can be profiled as well
+    time_hook_implementations(plugin_manager)
+    with minimal_project:
+        project = Project()
+        hook_profiler.start()
+        try:
+            plugin_manager.hook.ddc_project_options(project=project)
+            plugin_manager.hook.ddc_project_options(project=project)
+        finally:
+            hook_profiler.stop()
+
+    records = {record["plugin"]: record for record in hook_profiler.get_records()}
+    assert set(records) == {
+        "BaseProject",
+        "GreedyProject",
+        "LocalProject",
+        "LocalProjectRunmode",
+    }
+    assert records["GreedyProject"]["calls"] == 2
+    assert records["GreedyProject"]["memory"] >= 1024 * 1024
+    assert records["LocalProject"]["memory"] < 1024 * 1024
+    assert all(record["seconds"] > 0 for record in records.values())
+
+    # Nothing is recorded while the profiler is disabled
+    plugin_manager.hook.ddc_services_options()
+    assert all(
+        record["hook"] == "ddc_project_options"
+        for record in hook_profiler.get_records()
+    )
@@ -18,7 +18,7 @@ import yaml
 # We pin here versions hashes for example projects.
 # If the example projects are changed those
 # hashes will need to be updated.
-PROJECT_VERSIONS_HASHES = {"juniper": "ef5747", "koa": "b70fa3", "lilac": "b1d5ee"}
+PROJECT_VERSIONS_HASHES = {"juniper": "2257ad", "koa": "3eb716", "lilac": "e2c33f"}
 
 
 def test_complete_project(workdir, mocker, complete_project):
@@ -80,6 +80,19 @@ def test_minimal_project(minimal_project):
     assert project.docker_image_name == project.base_image
 
 
+def test_required_services(complete_project):
+    with complete_project:
+        project = Project()
+        if project.openedx_version.name == "lilac":
+            assert project.required_services == ["mysql57", "mongodb4", "rabbitmq"]
+            assert project.mysql_service == "mysql57"
+            assert project.mongodb_service == "mongodb4"
+        else:
+            assert project.required_services == ["mysql", "mongodb", "rabbitmq"]
+            assert project.mysql_service == "mysql"
+            assert project.mongodb_service == "mongodb"
+
+
 def test_runmode(minimal_project):
     with minimal_project:
         project = Project()
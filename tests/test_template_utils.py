@@ -0,0 +1,88 @@
+from jinja2 import Template
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+import time
+
+
+@pytest.fixture
+def jinja_cache_dir(tmp_path, mocker):
+    """Use a temporary directory for the jinja bytecode cache."""
+    from derex.runner import template_utils
+
+    cache_dir = tmp_path / "jinja_cache"
+    mocker.patch("derex.runner.template_utils.JINJA_CACHE_DIR", new=cache_dir)
+    template_utils.get_bytecode_cache.cache_clear()
+    template_utils.get_template_environment.cache_clear()
+    template_utils.get_directory_template_environment.cache_clear()
+    yield cache_dir
+    template_utils.get_bytecode_cache.cache_clear()
+    template_utils.get_template_environment.cache_clear()
+    template_utils.get_directory_template_environment.cache_clear()
+
+
+def test_get_template(jinja_cache_dir):
+    from derex.runner.template_utils import get_template
+    from derex.runner.template_utils import get_template_environment
+
+    assert get_template_environment() is get_template_environment()
+
+    # Templates are found both in the templates and compose_files directories
+    project = SimpleNamespace(name="my-project", e2e_dir=Path("/e2e"))
+    text = get_template("docker-compose-test.yml.j2").render(project=project)
+    assert "my-project_cypress" in text
+    text = get_template("mailslurper.json.j2").render(MYSQL_ROOT_PASSWORD="secret")
+    assert "secret" in text
+
+    # Compiled templates are stored in the bytecode cache
+    assert len(list(jinja_cache_dir.iterdir())) == 2
+
+
+def test_get_template_without_cache_dir(tmp_path, mocker):
+    from derex.runner import template_utils
+
+    not_a_directory = tmp_path / "file"
+    not_a_directory.write_text("")
+    mocker.patch(
+        "derex.runner.template_utils.JINJA_CACHE_DIR", new=not_a_directory / "cache"
+    )
+    template_utils.get_bytecode_cache.cache_clear()
+    template_utils.get_template_environment.cache_clear()
+    try:
+        assert template_utils.get_bytecode_cache() is None
+        assert template_utils.get_template("mailslurper.json.j2")
+    finally:
+        template_utils.get_bytecode_cache.cache_clear()
+        template_utils.get_template_environment.cache_clear()
+
+
+@pytest.mark.slowtest
+def test_template_rendering_benchmark(jinja_cache_dir):
+    """Compare rendering a template parsed on every call with
+    rendering it from the shared environment.
+    """
+    from derex.runner.constants import DDC_SERVICES_YML_PATH
+    from derex.runner.template_utils import get_template
+
+    context = dict(
+        MINIO_SECRET_KEY="minio",
+        MONGODB_ROOT_USERNAME="root",
+        MONGODB_ROOT_PASSWORD="mongodb",
+        MYSQL_ROOT_PASSWORD="mysql",
+    )
+    iterations = 50
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        uncached_text = Template(DDC_SERVICES_YML_PATH.read_text()).render(**context)
+    uncached = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        cached_text = get_template(DDC_SERVICES_YML_PATH.name).render(**context)
+    cached = time.perf_counter() - start
+
+    print(f"Rendering {iterations} times: parsed {uncached:.3f}s, cached {cached:.3f}s")
+    assert cached_text == uncached_text
+    assert cached < uncached